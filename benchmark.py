@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import logging
+
+import fake_caspio_server
+import mainProduction
+from mainProduction import CaspioDataPageProcessor, RetryPolicy
+
+# Stages of a sweep, in the order they run
+STAGES = ['startup', 'scrape', 'retry', 'write']
+
+
+def percentile(values, pct):
+    # Same nearest-rank percentile as AdaptiveTimeout
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def current_rss():
+    # Resident set size in bytes of this process (Chrome runs in child
+    # processes and is not included)
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # ru_maxrss is the peak of the whole run, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageTimer:
+    # Wall time, per-item latencies and peak RSS of one stage. RSS is sampled
+    # in the background while the stage runs.
+    def __init__(self, name, sample_interval=0.05):
+        self.name = name
+        self.sample_interval = sample_interval
+        self.latencies = []
+        self.items = 0
+        self.peak_rss = 0
+        self.seconds = 0
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def record(self, seconds, items=1):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.items += items
+
+    def _sample(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, current_rss())
+            if self._stop.wait(self.sample_interval):
+                return
+
+    def __enter__(self):
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+
+    def report(self, unit):
+        return {
+            'items': self.items,
+            'unit': unit,
+            'seconds': round(self.seconds, 4),
+            'per_second': round(self.items / self.seconds, 2) if self.seconds else None,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2) if self.latencies else None,
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2) if self.latencies else None,
+            'peak_rss_mb': round(self.peak_rss / 2 ** 20, 1)
+        }
+
+
+class BenchmarkProcessor(CaspioDataPageProcessor):
+    # Times driver start-up and every datapage visit. Without a browser no
+    # driver is started and the scrape stage is skipped.
+    def __init__(self, *args, browser=True, timer=None, **kwargs):
+        self.browser = browser
+        self.timer = timer
+        super().__init__(*args, **kwargs)
+        self.drivers = [driver for driver in self.drivers if driver is not None]
+
+    def _start_driver(self, email, password, worker_index=0):
+        if not self.browser:
+            return None
+        started = time.perf_counter()
+        driver = super()._start_driver(email, password, worker_index)
+        self.timer.record(time.perf_counter() - started)
+        return driver
+
+    def _process_datapage(self, driver, datapage, First=False):
+        started = time.perf_counter()
+        data_info = super()._process_datapage(driver, datapage, First)
+        self.timer.record(time.perf_counter() - started)
+        return data_info
+
+
+def instrument_writes(processor, written):
+    # Per-request latency of the REST client goes to the running stage, and
+    # the rows bulk_upsert wrote successfully to written[0]
+    api = processor.caspioAPI
+    request, bulk_upsert = api._request, api.bulk_upsert
+
+    def timed_request(method, url, authorized=True, **kwargs):
+        started = time.perf_counter()
+        try:
+            return request(method, url, authorized, **kwargs)
+        finally:
+            if processor.timer:
+                processor.timer.record(time.perf_counter() - started, items=0)
+
+    def counted_bulk_upsert(*args, **kwargs):
+        results = bulk_upsert(*args, **kwargs)
+        written[0] += sum(result['ok'] for result in results)
+        return results
+
+    api._request = timed_request
+    api.bulk_upsert = counted_bulk_upsert
+
+
+def synthetic_rows(data, changed_fraction, rng):
+    # What a full sweep would capture for every datapage, with a share of the
+    # rows already in the table changed so they need an update
+    rows = []
+    for datapage in data.all_datapages():
+        row = data.scraped_row(datapage)
+        if rng.random() < changed_fraction:
+            row['Style'] = row['Style'] + ' (changed)'
+        rows.append(row)
+    return rows
+
+
+def run_size(size, args):
+    # One benchmark pass against a fresh stand-in account of size datapages
+    server = fake_caspio_server.serve(
+        args.port, args.apps, size, args.existing, args.latency_ms, args.error_rate, seed=args.seed)
+    data = fake_caspio_server.FakeCaspioHandler.data
+    for name, value in fake_caspio_server.environment(args.port).items():
+        setattr(mainProduction, name, value)
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='caspio-benchmark-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    stages = {}
+    try:
+        # Start-up: browser logins and the REST snapshot, as the processor runs them
+        with StageTimer('startup') as timer:
+            processor = BenchmarkProcessor(
+                "benchmark@example.com", "benchmark", None, num_workers=args.workers,
+                api_rate=args.api_rate, api_burst=args.api_rate, pipelined=False,
+                retry_policy=RetryPolicy(base_delay=0.1, max_delay=1),
+                browser=not args.no_browser, timer=timer)
+        processor.timer = None
+        stages['startup'] = timer.report('drivers')
+        stages['startup']['datapages'] = len(processor.datapages)
+        written = [0]
+        instrument_writes(processor, written)
+
+        try:
+            # Scrape: datapage visits through the driver pool
+            if processor.drivers:
+                datapages = processor.datapages[:args.scrape_limit]
+                with StageTimer('scrape') as processor.timer:
+                    results = processor._process_datapages(datapages, "Benchmark scrape")
+                stages['scrape'] = processor.timer.report('pages')
+                stages['scrape']['failed'] = results.count(None)
+            else:
+                stages['scrape'] = {'skipped': 'no browser'}
+
+            rows = synthetic_rows(data, args.changed, rng)
+
+            # Retry: a share of the rows is logged as failed writes (plus any
+            # scrape failures above) and retried in the phase it failed in
+            for row in rng.sample(rows, int(len(rows) * args.retry_fraction)):
+                processor.errors.record('write', row['Caspio_App_Key'], row)
+            retried = len(processor.errors)
+            written[0] = 0
+            with StageTimer('retry') as processor.timer:
+                processor._retry_errors()
+            stages['retry'] = processor.timer.report('errors')
+            stages['retry'].update(items=retried, rows_written=written[0],
+                                   per_second=round(retried / processor.timer.seconds, 2)
+                                   if processor.timer.seconds else None)
+
+            # Write: every datapage of the account through the diff and bulk_upsert
+            written[0] = 0
+            with StageTimer('write') as processor.timer:
+                processor._postToCaspioTable(rows)
+            stages['write'] = processor.timer.report('rows')
+            stages['write'].update(items=written[0], rows_compared=len(rows),
+                                   per_second=round(written[0] / processor.timer.seconds, 2)
+                                   if processor.timer.seconds else None)
+            stages['write']['api_calls'] = dict(processor.caspioAPI.reset_call_counts())
+        finally:
+            processor._quit_drivers()
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        server.server_close()
+    return {'size': size, 'stages': stages}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(previous, current):
+    # Throughput change per size and stage against an earlier results file
+    earlier = {(result['size'], stage): report
+               for result in previous['results'] for stage, report in result['stages'].items()}
+    for result in current['results']:
+        for stage in STAGES:
+            report = result['stages'].get(stage, {})
+            before = earlier.get((result['size'], stage), {})
+            if report.get('per_second') and before.get('per_second'):
+                change = (report['per_second'] / before['per_second'] - 1) * 100
+                print(f"{result['size']:>6} {stage:<8} {before['per_second']:>10} -> "
+                      f"{report['per_second']:>10} {report['unit']}/s ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark a sweep stage by stage against the local Caspio stand-in")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help="datapages in the synthetic account, one pass per size (100 to 50000)")
+    parser.add_argument('--apps', type=int, default=2)
+    parser.add_argument('--existing', type=float, default=0.5,
+                        help="fraction of datapages already in WMV_Datapage_Definitions")
+    parser.add_argument('--changed', type=float, default=0.2,
+                        help="fraction of scraped rows that differ from the stored row")
+    parser.add_argument('--retry-fraction', type=float, default=0.05,
+                        help="fraction of rows logged as failed writes for the retry stage")
+    parser.add_argument('--workers', type=int, default=4, help="browsers in the driver pool")
+    parser.add_argument('--scrape-limit', type=int, default=200,
+                        help="datapages visited by the browsers per pass")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="skip driver start-up and the scrape stage")
+    parser.add_argument('--api-rate', type=float, default=1000,
+                        help="client-side REST rate limit in requests per second")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmarkResults.json')
+    parser.add_argument('--compare', help="earlier results file to compare throughput against")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': vars(args),
+        'results': []
+    }
+    for size in args.sizes:
+        result = run_size(size, args)
+        results['results'].append(result)
+        for stage in STAGES:
+            print(f"{size:>6} {stage:<8} {json.dumps(result['stages'].get(stage))}")
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
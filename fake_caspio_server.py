@@ -0,0 +1,340 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs, urlparse
+from datetime import datetime, timedelta
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FakeCaspioData:
+    # Synthetic account: applications, their datapages, what the UI shows for
+    # each datapage, and the tables served under rest/v2/tables
+    def __init__(self, num_apps=1, num_datapages=100, existing_fraction=0.5, seed=0):
+        rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.applications = []
+        self.datapages = {}
+        self.details = {}
+        self.tables = {'WMV_Datapage_Definitions': []}
+        self.next_pk = 1
+
+        base_date = datetime(2023, 1, 1)
+        for app_index in range(num_apps):
+            app = {
+                'AppName': 'WorkMovr 4' if app_index == 0 else f"Fake App {app_index + 1}",
+                'ExternalKey': uuid.UUID(int=rng.getrandbits(128)).hex
+            }
+            self.applications.append(app)
+            self.datapages[app['ExternalKey']] = []
+
+        for index in range(num_datapages):
+            app = self.applications[index % num_apps]
+            created = base_date + timedelta(days=rng.randrange(365))
+            modified = created + timedelta(days=rng.randrange(200), hours=rng.randrange(24))
+            datapage = {
+                'AppKey': uuid.UUID(int=rng.getrandbits(128)).hex[:30],
+                'AppName': app['AppName'],
+                'Name': f"Datapage {index + 1}",
+                'Path': f"Folder {index % 7 + 1}",
+                'DateCreated': created.strftime('%Y-%m-%dT%H:%M:%S'),
+                'DateModified': modified.strftime('%Y-%m-%dT%H:%M:%S'),
+                'CreatedBy': 'fake.author@example.com',
+                'ModifiedBy': 'fake.editor@example.com'
+            }
+            self.datapages[app['ExternalKey']].append(datapage)
+            host_pages = [
+                f"https://example.com/page-{index}-{host}.html - {(modified + timedelta(days=host)).strftime('%d %b %Y %I:%M %p')}"
+                for host in range(rng.randrange(1, 5))
+            ]
+            self.details[datapage['AppKey']] = {
+                'name': datapage['Name'],
+                'app_name': app['AppName'],
+                'deployed': rng.choice(['Enabled', 'Disabled']),
+                'data_source': rng.choice(['Tbl_Jobs', 'Tbl_Customers', 'VW_Schedule']),
+                'authentication': rng.choice(['None', 'Auth_Users']),
+                'style': rng.choice(['Default', 'Modern']),
+                'localization': rng.choice(['English (United States)', 'Default']),
+                'host_pages': host_pages
+            }
+            if rng.random() < existing_fraction:
+                self._insert('WMV_Datapage_Definitions', dict(
+                    self.scraped_row(datapage), Title=f"Title of {datapage['Name']}"))
+
+    def scraped_row(self, datapage):
+        # The row a sweep captures for this datapage from the listing and the
+        # ui/search page (see CaspioDataPageProcessor._process_datapage)
+        details = self.details[datapage['AppKey']]
+        last_used = max(datetime.strptime(page.rsplit(' - ', 1)[1], '%d %b %Y %I:%M %p')
+                        for page in details['host_pages'])
+        return {
+            'Channel_KW': 'UNIVERSAL',
+            'Active_YN': '1',
+            'Caspio_App_Key': datapage['AppKey'],
+            'App_Name': datapage['AppName'],
+            'Path': datapage['Path'],
+            'Name': datapage['Name'],
+            'Deployed_YN': details['deployed'],
+            'Data_Source': details['data_source'],
+            'Authentication': details['authentication'],
+            'Style': details['style'],
+            'Localization': details['localization'],
+            'Last_Used_Date': last_used.strftime('%m/%d/%Y'),
+            'Created_Date': datapage['DateCreated'],
+            'Created_By_Person_Name': datapage['CreatedBy'],
+            'Last_Modified_Date': datetime.strptime(
+                datapage['DateModified'], '%Y-%m-%dT%H:%M:%S').strftime('%m/%d/%Y'),
+            'Last_Modified_By_Person_Name': datapage['ModifiedBy']
+        }
+
+    def _insert(self, table_name, row):
+        row = dict(row, PK_ID=self.next_pk)
+        self.next_pk += 1
+        self.tables.setdefault(table_name, []).append(row)
+        return row
+
+    def all_datapages(self):
+        return [datapage for datapages in self.datapages.values() for datapage in datapages]
+
+    def select(self, table_name, where=None):
+        predicate = parse_where(where)
+        return [row for row in self.tables.get(table_name, []) if predicate(row)]
+
+    def insert(self, table_name, row):
+        with self.lock:
+            return self._insert(table_name, row)
+
+    def update(self, table_name, where, values):
+        with self.lock:
+            rows = self.select(table_name, where)
+            for row in rows:
+                row.update(values)
+            return rows
+
+
+def parse_where(where):
+    # Supports the filters the processor sends: Field='value' and Field IN ('a', 'b')
+    if not where:
+        return lambda row: True
+    match = re.fullmatch(r"\s*(\w+)\s*(=|IN)\s*(.+?)\s*", where, re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Unsupported q.where: {where}")
+    field, operator, value = match.groups()
+    values = {item.replace("''", "'") for item in re.findall(r"'((?:[^']|'')*)'", value)}
+    return lambda row: str(row.get(field)) in values
+
+
+class FakeCaspioHandler(BaseHTTPRequestHandler):
+    # Set by serve()
+    data = None
+    latency = 0
+    error_rate = 0
+    ui_host = '127.0.0.1'
+    token = 'fake-access-token'
+    sessions = set()
+
+    def log_message(self, format, *args):
+        logging.debug(format, *args)
+
+    def _delay_and_maybe_fail(self):
+        if self.latency:
+            time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if self.error_rate and random.random() < self.error_rate:
+            if random.random() < 0.5:
+                self._send_json(429, {'Message': 'Too many requests'}, {'Retry-After': '1'})
+            else:
+                self._send_json(503, {'Message': 'Service unavailable'})
+            return True
+        return False
+
+    def _send(self, status, body, content_type, headers=None):
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload), 'application/json', headers)
+
+    def _send_fixture(self, name):
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as file:
+            self._send(200, file.read(), 'text/html; charset=utf-8')
+
+    def _redirect(self, location, cookie=None):
+        self.send_response(302)
+        self.send_header('Location', location)
+        if cookie:
+            self.send_header('Set-Cookie', cookie)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _authorized(self):
+        if self.headers.get('Authorization') == f"Bearer {self.token}":
+            return True
+        self._send_json(401, {'Message': 'Invalid token'})
+        return False
+
+    def _has_session(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return 'CaspioSession' in cookie and cookie['CaspioSession'].value in self.sessions
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = url.path
+
+        if path == '/login':
+            return self._send_fixture('login.html')
+        if path == '/ui/login-complete':
+            return self._redirect('/ui/search', f"CaspioSession={query.get('session', '')}; Path=/")
+        if path in ('/ui/search', '/ui/dashboard'):
+            return self._send_fixture('ui_search.html')
+        if path.startswith('/ui/api/'):
+            return self._ui_api(path)
+        if path.startswith('/rest/v2/'):
+            return self._rest_get(path[len('/rest/v2/'):], query)
+        self._send_json(404, {'Message': 'Not found'})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+
+        if path == '/login':
+            # Any credentials work; the session cookie is set on the UI host
+            session = uuid.uuid4().hex
+            self.sessions.add(session)
+            port = self.server.server_address[1]
+            return self._redirect(f"http://{self.ui_host}:{port}/ui/login-complete?session={session}")
+        if path == '/oauth/token':
+            if self._delay_and_maybe_fail():
+                return
+            return self._send_json(200, {'access_token': self.token, 'token_type': 'bearer',
+                                         'expires_in': 3600})
+        match = re.fullmatch(r'/rest/v2/tables/(\w+)/records', path)
+        if match:
+            if not self._authorized() or self._delay_and_maybe_fail():
+                return
+            row = self.data.insert(match.group(1), json.loads(body))
+            return self._send_json(201, {'Result': [row]})
+        self._send_json(404, {'Message': 'Not found'})
+
+    def do_PUT(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self._read_body()
+        match = re.fullmatch(r'/rest/v2/tables/(\w+)/records', url.path)
+        if not match:
+            return self._send_json(404, {'Message': 'Not found'})
+        if not self._authorized() or self._delay_and_maybe_fail():
+            return
+        rows = self.data.update(match.group(1), query.get('q.where'), json.loads(body))
+        self._send_json(200, {'RecordsAffected': len(rows), 'Result': rows})
+
+    def _rest_get(self, resource, query):
+        if not self._authorized() or self._delay_and_maybe_fail():
+            return
+        if resource == 'applications':
+            return self._send_json(200, {'Result': self.data.applications})
+
+        match = re.fullmatch(r'applications/(\w+)/datapages', resource)
+        if match:
+            if match.group(1) not in self.data.datapages:
+                return self._send_json(404, {'Message': 'Application not found'})
+            return self._send_json(200, {'Result': self.data.datapages[match.group(1)]})
+
+        match = re.fullmatch(r'tables/(\w+)/records', resource)
+        if match:
+            rows = self.data.select(match.group(1), query.get('q.where'))
+            page_size = min(1000, int(query.get('q.pageSize', 100)))
+            page_number = int(query.get('q.pageNumber', 1))
+            rows = rows[(page_number - 1) * page_size:page_number * page_size]
+            if query.get('q.select'):
+                fields = [field.strip() for field in query['q.select'].split(',')]
+                rows = [{field: row.get(field) for field in fields} for row in rows]
+            return self._send_json(200, {'Result': rows})
+        self._send_json(404, {'Message': 'Not found'})
+
+    def _ui_api(self, path):
+        # What the UI page loads over XHR, behind the login session cookie
+        if not self._has_session():
+            return self._send_json(401, {'Message': 'Not logged in'})
+        if self._delay_and_maybe_fail():
+            return
+        match = re.fullmatch(r'/ui/api/datapages/(\w+)', path)
+        if not match or match.group(1) not in self.data.details:
+            return self._send_json(404, {'Message': 'Not found'})
+        self._send_json(200, self.data.details[match.group(1)])
+
+
+def serve(port=8765, num_apps=1, num_datapages=100, existing_fraction=0.5,
+          latency_ms=0, error_rate=0, ui_host='127.0.0.1', seed=0):
+    # Returns the running server; call shutdown() on it to stop
+    FakeCaspioHandler.data = FakeCaspioData(num_apps, num_datapages, existing_fraction, seed)
+    FakeCaspioHandler.latency = latency_ms / 1000
+    FakeCaspioHandler.error_rate = error_rate
+    FakeCaspioHandler.ui_host = ui_host
+    server = ThreadingHTTPServer(('0.0.0.0', port), FakeCaspioHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def environment(port=8765, ui_host='127.0.0.1', login_host='localhost'):
+    # Settings that point mainProduction.py at the stand-in. Login runs on a
+    # different host name so the processor can tell when it has finished.
+    return {
+        'CASPIO_BASE_URL': f"http://{ui_host}:{port}/",
+        'CASPIO_TOKEN_URL': f"http://{ui_host}:{port}/oauth/token",
+        'CASPIO_LOGIN_URL': f"http://{login_host}:{port}/login",
+        'CASPIO_UI_DATAPAGE_PATH': 'ui/api/datapages/{app_key}'
+    }
+
+
+def parse_ui_datapage(payload):
+    # ui_parser for the JSON served by _ui_api: the listing columns and the
+    # host pages lines. Caspio's own route and fields have to be looked up in
+    # the browser's network tab; this only matches the stand-in.
+    columns = ('deployed', 'data_source', 'authentication', 'style', 'localization')
+    return {column: payload[column] for column in columns}, payload.get('host_pages') or []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Caspio REST API and UI")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--apps', type=int, default=1, help="number of applications")
+    parser.add_argument('--datapages', type=int, default=100, help="datapages across all applications")
+    parser.add_argument('--existing', type=float, default=0.5,
+                        help="fraction of datapages already in WMV_Datapage_Definitions")
+    parser.add_argument('--latency-ms', type=float, default=0, help="mean latency added to every call")
+    parser.add_argument('--error-rate', type=float, default=0, help="fraction of calls answered with 429/503")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.apps, args.datapages, args.existing,
+                   args.latency_ms, args.error_rate, seed=args.seed)
+    logging.info(f"Fake Caspio listening on port {args.port}. Point the processor at it with:")
+    for name, value in environment(args.port).items():
+        print(f"export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
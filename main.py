@@ -1,20 +1,11 @@
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver import ActionChains
+# selenium, tqdm and pandas are imported where they are used, so the REST
+# client can be imported without them
 import ast
 import re
 import time
 from requests.auth import HTTPBasicAuth
 import requests
-import pandas as pd
-from openpyxl import Workbook
 from datetime import datetime
-from tqdm import tqdm
 import logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -193,6 +184,8 @@ class CaspioDataPageProcessor:
         logging.info(f"Number of  datapages: {len(self.datapages)}")
 
     def _initialize_driver(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--window-size=1920,1080")
@@ -204,6 +197,11 @@ class CaspioDataPageProcessor:
         return driver
 
     def _login(self, email, password):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
         login_url = "https://id.caspio.com/login"
         self.driver.get(login_url)
         try:
@@ -222,6 +220,12 @@ class CaspioDataPageProcessor:
             exit()
 
     def _process_datapage(self, datapage, First=False):
+        from selenium.common.exceptions import NoSuchElementException, TimeoutException
+        from selenium.webdriver import ActionChains
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         def find_last_used_date(data_array):
             most_recent_date = None
             most_recent_date_str = ""
@@ -393,6 +397,7 @@ class CaspioDataPageProcessor:
             return None
 
     def run(self):
+        from tqdm import tqdm
         for i, datapage in tqdm(enumerate(self.datapages), total=len(self.datapages), desc="Processing datapages"):
             data_info = self._process_datapage(datapage, First=(i == 0))
             if data_info:
@@ -404,6 +409,7 @@ class CaspioDataPageProcessor:
         self._postToCaspioTable()
 
     def _postToCaspioTable(self):
+        from tqdm import tqdm
 
         for datapage_info in tqdm(self.allDataPagesInfo, desc="Processing datapages"):
             # Check if the row already exists in Tbl_Temp_Datapage_List_From_Bridge
@@ -451,17 +457,20 @@ class CaspioDataPageProcessor:
                 file.write(str(error) + '\n')
 
     def save_to_excel(self):
+        import pandas as pd
         df = pd.DataFrame(self.allDataPagesInfo)
         with pd.ExcelWriter('allDataPagesInfo.xlsx', engine='openpyxl') as writer:
             df.to_excel(writer, index=False)
         print("Excel file created successfully.")
 
     def save_to_csv(self):
+        import pandas as pd
         df = pd.DataFrame(self.allDataPagesInfo)
         df.to_csv('allDataPagesInfo.csv', index=False)
         print("CSV file created successfully.")
 
     def _retry_errors(self, errorLogsCaspioDataPageProcessor=False):
+        from tqdm import tqdm
         successfully_processed = []
 
         if errorLogsCaspioDataPageProcessor:
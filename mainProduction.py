@@ -1,57 +1,733 @@
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver import ActionChains
-import ast
+# selenium, lxml, openpyxl and tqdm are imported where they are used, so
+# REST-only commands start without loading them (see the commands below)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from collections import Counter, deque
+from itertools import chain, zip_longest
+from dataclasses import asdict, dataclass, field
+from contextlib import contextmanager
+import argparse
+import asyncio
+import csv
+import json
+import os
+import queue
+import random
 import re
+import sys
+import threading
 import time
+from urllib.parse import urlencode, urlparse
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 import requests
-import pandas as pd
-from openpyxl import Workbook
-from datetime import datetime
-from tqdm import tqdm
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Caspio endpoints. The environment overrides them, e.g. to run against the
+# local stand-in in fake_caspio_server.py.
+CASPIO_BASE_URL = os.environ.get('CASPIO_BASE_URL', 'https://umnitech.caspio.com/')
+CASPIO_TOKEN_URL = os.environ.get('CASPIO_TOKEN_URL', 'https://c0abo866.caspio.com/oauth/token')
+CASPIO_LOGIN_URL = os.environ.get('CASPIO_LOGIN_URL', 'https://id.caspio.com/login')
+# JSON the ui/search page loads for a datapage, relative to CASPIO_BASE_URL
+# and with {app_key}. Caspio does not document its UI routes, so there is no
+# default: extraction='api' needs it together with a ui_parser for its JSON.
+CASPIO_UI_DATAPAGE_PATH = os.environ.get('CASPIO_UI_DATAPAGE_PATH')
+
+
+def normalize_date(value):
+    # Caspio returns ISO timestamps while scraped rows carry MM/DD/YYYY;
+    # reduce both to YYYY-MM-DD so they can be compared
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    value = str(value).strip()
+    for fmt, text in (('%Y-%m-%d', value.split('T')[0]), ('%m/%d/%Y', value)):
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return value
+
+
+TRUE_FLAGS = {'1', 'y', 'yes', 'true', 'enabled'}
+FALSE_FLAGS = {'0', 'n', 'no', 'false', 'disabled'}
+
+
+def normalize_field(field, value):
+    # Canonical form used for comparisons only; writes keep the scraped value.
+    # Fields are typed by their suffix: *_Date are dates, *_YN are Yes/No flags.
+    if isinstance(value, str):
+        value = ' '.join(value.split())
+    if value in ('', None):
+        value = None
+    if field.endswith('_Date'):
+        return normalize_date(value)
+    if field.endswith('_YN'):
+        # Caspio returns Yes/No fields as booleans and never as null
+        if value is None:
+            return False
+        flag = str(value).lower()
+        if flag in TRUE_FLAGS:
+            return True
+        if flag in FALSE_FLAGS:
+            return False
+    return value
+
+
+def diff_fields(existing_row, new_data, ignore=()):
+    # Fields of new_data whose normalized value differs from the stored row.
+    # Only columns the stored row actually has are compared.
+    return {field: value for field, value in new_data.items()
+            if field in existing_row and field not in ignore
+            and normalize_field(field, existing_row[field]) != normalize_field(field, value)}
+
+
+# Listing columns of the datapage row on ui/search (after the column settings
+# are applied). correct_xpath() covers the layout without the nested div[2].
+LISTING_XPATHS = {
+    'deployed': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[8]/div',
+    'data_source': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[3]/div',
+    'authentication': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[6]/div',
+    'style': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[4]/div',
+    'localization': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[5]/div'
+}
+PROPERTIES_LINES_XPATH = "//div[@class='RowProperties Show']/div[@class='Content']/div[@class='Line']"
+
+
+def correct_xpath(xpath):
+    parts = xpath.split('/')
+    corrected = []
+    div2_count = 0
+    for part in parts:
+        if 'div[2]' in part:
+            div2_count += 1
+            if div2_count == 2:
+                continue
+        corrected.append(part)
+    return '/'.join(corrected)
+
+
+def element_text(element):
+    # Whitespace-collapsed text, close to what WebElement.text reports
+    return ' '.join(element.text_content().split())
+
+
+def extract_listing_info(page_source):
+    # Listing column values from one page_source snapshot of ui/search
+    import lxml.html
+    tree = lxml.html.fromstring(page_source)
+    data_info = {}
+    for key, xpath in LISTING_XPATHS.items():
+        elements = tree.xpath(xpath) or tree.xpath(correct_xpath(xpath))
+        if not elements:
+            raise ValueError(f"Listing column '{key}' not found in page source.")
+        data_info[key] = element_text(elements[0])
+    return data_info
+
+
+def extract_properties_lines(page_source):
+    # Texts of the div elements of every Line in the open Properties panel
+    import lxml.html
+    tree = lxml.html.fromstring(page_source)
+    return [[element_text(element) for element in line.xpath('.//div')]
+            for line in tree.xpath(PROPERTIES_LINES_XPATH)]
+
+
+def find_last_used_date(data_array):
+    # Most recent 'DD Mon YYYY HH:MM AM' date among the texts, as MM/DD/YYYY
+    most_recent_date = None
+    most_recent_date_str = ""
+    date_pattern = re.compile(r'(\d{2} \w{3} \d{4} \d{2}:\d{2} [AP]M)')
+
+    for item in data_array:
+        matches = date_pattern.findall(item)
+        for date_str in matches:
+            try:
+                date = datetime.strptime(date_str, '%d %b %Y %I:%M %p')
+                if most_recent_date is None or date > most_recent_date:
+                    most_recent_date = date
+                    most_recent_date_str = date.strftime(
+                        '%m/%d/%Y')  # Format date as MM/DD/YYYY
+            except ValueError:
+                continue
+
+    return most_recent_date_str if most_recent_date_str else None
+
+
+# After this many failed JSON fetches in a row the sweep stays on the browser
+UI_MAX_CONSECUTIVE_FAILURES = 10
+
+
+# Poll readiness often: WebDriverWait's default 0.5s poll adds up over a sweep
+WAIT_POLL = 0.1
+
+# Before navigating, the current listing row is tagged; the listing counts as
+# rendered once the document and jQuery are idle and the row under ListContent
+# is either a new element or carries the target AppKey. Names are not unique
+# (app copies share them), so they cannot tell two listings apart.
+MARK_LISTING_STALE_JS = """
+var row = document.evaluate('//*[@id="ListContent"]/div[2]', document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (row) { row.setAttribute('data-sweep-stale', '1'); }
+"""
+LISTING_READY_JS = """
+var appKey = arguments[0];
+if (document.readyState !== 'complete') { return false; }
+if (window.jQuery && window.jQuery.active > 0) { return false; }
+var row = document.evaluate('//*[@id="ListContent"]/div[2]', document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!row) { return false; }
+if (!row.hasAttribute('data-sweep-stale')) { return true; }
+return appKey !== '' && row.outerHTML.indexOf(appKey) !== -1;
+"""
+
+
+# Lightweight scraper profile (see CaspioDataPageProcessor.lightweight_profile)
+LIGHTWEIGHT_CHROME_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false"
+]
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.wav",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*facebook.net*", "*segment.io*", "*nr-data.net*",
+    "*intercom.io*", "*fullstory.com*"
+]
+
+
+class AdaptiveTimeout:
+    # Wait timeout that follows observed page latencies: multiplier x p95 of
+    # the recent samples, clamped to [minimum, maximum]. Until min_samples
+    # pages were seen the default is used. Shared by all driver workers.
+    def __init__(self, default=10, minimum=2, maximum=30, multiplier=3, window=200, min_samples=20):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct):
+        with self.lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    @property
+    def timeout(self):
+        if len(self.samples) < self.min_samples:
+            return self.default
+        return min(self.maximum, max(self.minimum, self.percentile(95) * self.multiplier))
+
+
+@dataclass
+class ErrorRecord:
+    # One failed datapage. phase is 'scrape' (payload is the datapage from the
+    # REST listing) or 'write' (payload is the DataPageInfo that failed to save).
+    phase: str
+    app_key: str
+    payload: dict
+    exception: str = None
+    attempts: int = 1
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat(timespec='seconds'))
+
+
+class ErrorJournal:
+    # Unresolved ErrorRecords keyed by (phase, AppKey), stored one JSON object
+    # per line. Failing again bumps the attempt count instead of adding a line.
+    def __init__(self, path='errorLogsCaspioDataPageProcessor.jsonl'):
+        self.path = path
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.records)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    record = ErrorRecord(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A line cut short, or not a record at all
+                    logging.warning(f"Skipping an unreadable line in {self.path}.")
+                    continue
+                self.records[(record.phase, record.app_key)] = record
+        logging.info(f"Loaded {len(self.records)} errors from {self.path}.")
+
+    def save(self):
+        with self.lock:
+            records = list(self.records.values())
+        # Written to a temporary file first, so a crash never leaves a
+        # half-written log behind
+        temp_file = self.path + '.tmp'
+        with open(temp_file, 'w') as file:
+            for record in records:
+                file.write(json.dumps(asdict(record), default=str) + '\n')
+        os.replace(temp_file, self.path)
+
+    def record(self, phase, app_key, payload, exception=None):
+        exception_name = type(exception).__name__ if isinstance(exception, BaseException) else exception
+        with self.lock:
+            previous = self.records.get((phase, app_key))
+            self.records[(phase, app_key)] = ErrorRecord(
+                phase, app_key, payload, exception_name,
+                attempts=previous.attempts + 1 if previous else 1)
+
+    def resolve(self, phase, app_key):
+        with self.lock:
+            self.records.pop((phase, app_key), None)
+
+    def pending(self, phase):
+        with self.lock:
+            return [record for record in self.records.values() if record.phase == phase]
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failures and keeps every caller
+    # waiting in wait_until_closed() for cooldown seconds. After that, calls go
+    # through again; one more failure re-opens it, one success closes it.
+    def __init__(self, failure_threshold=5, cooldown=30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        # Seconds until the breaker lets calls through again
+        with self.lock:
+            return max(0, self.open_until - time.monotonic())
+
+    def wait_until_closed(self):
+        while True:
+            remaining = self.remaining()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                if self.open_until <= time.monotonic():
+                    logging.warning(
+                        f"{self.consecutive_failures} consecutive failures, pausing for {self.cooldown}s.")
+                self.open_until = time.monotonic() + self.cooldown
+
+
+class RetryPolicy:
+    # Shared by the REST client and the scrape workers: up to max_attempts
+    # tries per request or datapage, exponential backoff with full jitter,
+    # at most run_budget retries per run, and one circuit breaker for all.
+    def __init__(self, max_attempts=4, base_delay=1, max_delay=60, run_budget=500, breaker=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.run_budget = run_budget
+        self.breaker = breaker or CircuitBreaker()
+        self.lock = threading.Lock()
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def can_retry(self, attempt):
+        # attempt is the number of tries made so far
+        if attempt >= self.max_attempts:
+            return False
+        with self.lock:
+            if self.run_budget <= 0:
+                return False
+            self.run_budget -= 1
+            return True
+
+
+def is_browser_failure(error):
+    # Whether a failed datapage visit says something about the browser or
+    # Caspio (a crashed tab, a connection error) and should count toward the
+    # circuit breaker. A missing element, a listing that never got ready or a
+    # page that does not parse fails the same way on every try, so it only
+    # uses the datapage's own attempts.
+    from selenium.common.exceptions import (
+        ElementNotInteractableException, NoSuchElementException,
+        StaleElementReferenceException, TimeoutException, WebDriverException)
+    page_errors = (ElementNotInteractableException, NoSuchElementException,
+                   StaleElementReferenceException, TimeoutException)
+    return isinstance(error, WebDriverException) and not isinstance(error, page_errors)
+
+
+def parse_retry_after(response):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    # Client-side rate limit: rate requests per second on average, with up to
+    # burst requests at once. reserve() claims a slot and returns how long the
+    # caller has to wait for it, so blocking and async callers can share one.
+    def __init__(self, rate=10, burst=20):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return -self.tokens / self.rate if self.tokens < 0 else 0
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# Histogram buckets in seconds, from a quick REST call to a slow page load
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class SweepMetrics:
+    # Counters, gauges and latency histograms of a sweep, labelled like
+    # Prometheus series and shared by every thread. report() is the JSON run
+    # report, write_prometheus() the node_exporter textfile. Percentiles in
+    # the report are over the last `window` observations of each series.
+    def __init__(self, prefix='caspio', buckets=LATENCY_BUCKETS, window=10000):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.window = window
+        self.counters = Counter()
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def increment(self, name, amount=1, **labels):
+        with self.lock:
+            self.counters[name, self._labels(labels)] += amount
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[name, self._labels(labels)] = value
+
+    def observe(self, name, seconds, **labels):
+        key = name, self._labels(labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': [0] * len(self.buckets), 'count': 0, 'sum': 0.0,
+                    'samples': deque(maxlen=self.window)}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['buckets'][index] += 1
+                    break
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            histogram['samples'].append(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+
+    def report(self):
+        with self.lock:
+            counters = list(self.counters.items())
+            gauges = list(self.gauges.items())
+            histograms = [(key, dict(value, samples=sorted(value['samples'])))
+                          for key, value in self.histograms.items()]
+
+        def percentile(samples, pct):
+            return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else None
+
+        return {
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters)],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value}
+                       for (name, labels), value in sorted(gauges)],
+            'histograms': [{'name': name, 'labels': dict(labels), 'count': value['count'],
+                            'sum': round(value['sum'], 4),
+                            'mean': round(value['sum'] / value['count'], 4) if value['count'] else None,
+                            'p50': percentile(value['samples'], 50),
+                            'p95': percentile(value['samples'], 95),
+                            'max': value['samples'][-1] if value['samples'] else None}
+                           for (name, labels), value in sorted(histograms, key=lambda item: item[0])]
+        }
+
+    def write_json(self, path, **run_info):
+        with open(path, 'w') as file:
+            json.dump({**run_info, **self.report()}, file, indent=2, default=str)
+
+    def write_prometheus(self, path):
+        # Written to a temporary file first: the textfile collector must never
+        # read a half-written file
+        def series(name, labels, extra=()):
+            labels = list(labels) + list(extra)
+            if not labels:
+                return f"{self.prefix}_{name}"
+            text = ",".join('{}="{}"'.format(
+                key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for key, value in labels)
+            return f"{self.prefix}_{name}{{{text}}}"
+
+        with self.lock:
+            lines = []
+            for kind, values in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(values.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{series(name, labels)} {value}")
+            typed = set()
+            for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+                if name not in typed:
+                    lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram['buckets']):
+                    cumulative += count
+                    lines.append(f"{series(name + '_bucket', labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{series(name + '_bucket', labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{series(name + '_sum', labels)} {histogram['sum']}")
+                lines.append(f"{series(name + '_count', labels)} {histogram['count']}")
+
+        temp_file = path + '.tmp'
+        with open(temp_file, 'w') as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temp_file, path)
+
+
+# Statuses worth retrying. POST is only retried on 429, which Caspio returns
+# before doing anything; a 5xx may come after the record was created.
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
 
 class CaspioAPI:
-    def __init__(self):
-        self.token = self.get_access_token()
+    def __init__(self, pool_size=10, retry_policy=None, rate=10, burst=20,
+                 token_cache_file='.caspioTokenCache.json', refresh_margin=300, metrics=None,
+                 timeout=(10, 60)):
+        # One keep-alive session shared by every call (and every worker thread)
+        self.session = self._create_session(pool_size)
+        # (connect, read) seconds for every request, so a stalled connection
+        # fails into the retry policy instead of holding its pool slot forever
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Stay under the account's API limits, and count what a sweep uses
+        self.rate_limiter = TokenBucket(rate, burst)
+        self.call_counts = Counter()
+        self.call_counts_lock = threading.Lock()
+        # Latency by endpoint and status, retries and token renewals
+        self.metrics = metrics or SweepMetrics()
+        self.base_url = CASPIO_BASE_URL + "rest/v2/"
+        self.session.headers.update({"Accept": "application/json"})
+
+        self.client_id = os.environ.get('CASPIO_CLIENT_ID', '')
+        self.client_secret = os.environ.get('CASPIO_CLIENT_SECRET', '')
+        self.token_url = CASPIO_TOKEN_URL
+        # The token is cached on disk and renewed refresh_margin seconds
+        # before it expires; see get_access_token()
+        self.token_cache_file = token_cache_file
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.token_expires_at = 0
+        self.token_lock = threading.Lock()
+        self.get_access_token()
         # print(self.token)
-        self.base_url = "https://umnitech.caspio.com/rest/v2/"
 
-    def get_access_token(self):
-        client_id = ''
-        client_secret = ''
-        token_url = 'https://c0abo866.caspio.com/oauth/token'
+    def _create_session(self, pool_size):
+        session = requests.Session()
+        # pool_block keeps the number of open connections at pool_size
+        # when more threads than that share the session
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _request(self, method, url, authorized=True, **kwargs):
+        # Every REST call goes through here to share the retry policy.
+        # Authorized calls carry the current token and, on a 401, renew it
+        # and try once more.
+        policy = self.retry_policy
+        retryable = {429} if method == 'POST' else RETRYABLE_STATUS
+        attempt = 0
+        token_renewed = False
+        while True:
+            policy.breaker.wait_until_closed()
+            attempt += 1
+            if authorized:
+                token = self.get_access_token()
+                kwargs['headers'] = {**kwargs.get('headers', {}), "Authorization": f"Bearer {token}"}
+            self.rate_limiter.acquire()
+            endpoint = self._count_call(method, url)
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            self.metrics.observe(
+                'api_request_seconds', time.monotonic() - started, method=method, endpoint=endpoint,
+                status=response.status_code if response is not None else type(error).__name__)
+
+            if authorized and response is not None and response.status_code == 401 and not token_renewed:
+                logging.info("Access token rejected, renewing it.")
+                self.metrics.increment('token_renewals_total')
+                self.get_access_token(stale_token=token)
+                token_renewed = True
+                attempt -= 1
+                continue
+            if response is not None and response.status_code not in retryable:
+                if response.status_code >= 500:
+                    policy.breaker.record_failure()
+                else:
+                    policy.breaker.record_success()
+                return response
+            policy.breaker.record_failure()
+            if (error and method == 'POST') or not policy.can_retry(attempt):
+                if error:
+                    raise error
+                return response
+
+            delay = policy.delay(attempt, retry_after=parse_retry_after(response))
+            self.metrics.increment('retries_total', scope='api', endpoint=endpoint)
+            logging.warning(
+                f"{method} {url} failed ({error or response.status_code}), retry {attempt} in {delay:.1f}s.")
+            time.sleep(delay)
+
+    def _count_call(self, method, url):
+        # Counts the call under its endpoint label, which is returned: the path
+        # without host and query, e.g. "tables/X/records", with application
+        # keys replaced so every application shares one label
+        url = url.split('?')[0]
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else urlparse(url).path.lstrip('/')
+        endpoint = re.sub(r'^applications/[^/]+/', 'applications/{key}/', path)
+        with self.call_counts_lock:
+            self.call_counts[f"{method} {endpoint}"] += 1
+        return endpoint
+
+    def reset_call_counts(self):
+        # Returns the calls counted so far and starts a new count
+        with self.call_counts_lock:
+            counts, self.call_counts = self.call_counts, Counter()
+        return counts
+
+    def get_access_token(self, stale_token=None):
+        # Returns a token that is valid for at least refresh_margin seconds,
+        # from memory, the cache file or the token endpoint, in that order.
+        # Passing the token a request was rejected with forces a new one
+        # unless another thread already replaced it.
+        with self.token_lock:
+            if stale_token is not None:
+                if stale_token != self.token:
+                    return self.token
+            elif self.token and time.time() < self.token_expires_at - self.refresh_margin:
+                return self.token
+            else:
+                cached = self._read_token_cache()
+                if cached:
+                    self.token, self.token_expires_at = cached
+                    return self.token
 
+            self.token, self.token_expires_at = self._fetch_access_token()
+            if self.token:
+                self._write_token_cache()
+            return self.token
+
+    def _read_token_cache(self):
+        try:
+            with open(self.token_cache_file, 'r') as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if (cached.get('token_url') != self.token_url or cached.get('client_id') != self.client_id
+                or time.time() >= cached.get('expires_at', 0) - self.refresh_margin):
+            return None
+        logging.info("Access token loaded from cache.")
+        return cached['access_token'], cached['expires_at']
+
+    def _write_token_cache(self):
+        # Only the current user may read the cached token
+        temp_file = self.token_cache_file + '.tmp'
+        descriptor = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump({'token_url': self.token_url, 'client_id': self.client_id,
+                       'access_token': self.token, 'expires_at': self.token_expires_at}, file)
+        os.replace(temp_file, self.token_cache_file)
+
+    def _fetch_access_token(self):
         data = {
             'grant_type': 'client_credentials'
         }
 
         try:
-            response = requests.post(
-                token_url, data=data, auth=HTTPBasicAuth(client_id, client_secret))
+            response = self._request(
+                'POST', self.token_url, authorized=False, data=data,
+                auth=HTTPBasicAuth(self.client_id, self.client_secret))
 
             if response.status_code == 200:
                 logging.info("Access token successfully fetched.")
-                return response.json().get('access_token')
+                token = response.json()
+                return token.get('access_token'), time.time() + token.get('expires_in', 3600)
             else:
                 logging.error(
                     f"Error fetching access token: {response.status_code} - {response.text}")
                 print(
                     f"Error fetching access token: {response.status_code} - {response.text}")
-                return None
+                return None, 0
         except Exception as e:
             logging.exception(
                 "An error occurred while fetching the access token.")
-            return None
+            return None, 0
 
     # Call the method to get applications
     # Pass an optional parameter 'app_name' if you want to filter applications by AppName
@@ -60,13 +736,7 @@ class CaspioAPI:
         # Endpoint URL
         url = self.base_url + "applications"
 
-        # Headers
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.token}"
-        }
-
-        response = requests.get(url, headers=headers)
+        response = self._request('GET', url)
 
         if response.status_code == 200:
             applications = response.json()["Result"]
@@ -98,12 +768,7 @@ class CaspioAPI:
             print("Missing external_key parameter.")
             return None
 
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.token}"
-        }
-
-        response = requests.get(url, headers=headers)
+        response = self._request('GET', url)
 
         if response.status_code == 200:
             return response.json()['Result']
@@ -112,32 +777,45 @@ class CaspioAPI:
             print("Response content:", response.text)
             return None
 
-    def get_table_data(self, table_name):
+    def iter_table_data(self, table_name, select=None, where=None, page_size=1000):
+        # Yields every record of the table, one REST page at a time.
+        # Caspio caps q.pageSize at 1000, so the default keeps round trips lowest.
         url = f"{self.base_url}tables/{table_name}/records"
-        headers = {
-            "Accept": "application/json",
-            "Authorization": f"Bearer {self.token}"
-        }
+        params = {"q.pageSize": page_size}
+        if select:
+            params["q.select"] = select if isinstance(select, str) else ",".join(select)
+        if where:
+            params["q.where"] = where
+
+        page_number = 1
+        while True:
+            params["q.pageNumber"] = page_number
+            response = self._request('GET', url, params=params)
+            if response.status_code != 200:
+                logging.error(
+                    f"Error fetching data from table: {response.status_code} - {response.text}")
+                raise requests.HTTPError(
+                    f"{response.status_code} fetching page {page_number} of {table_name}", response=response)
 
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            logging.info("Data successfully fetched from table.")
-            return response.json().get('Result')
-        else:
-            logging.error(
-                f"Error fetching data from table: {response.status_code} - {response.text}")
+            rows = response.json().get('Result') or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            page_number += 1
+
+    def get_table_data(self, table_name, select=None, where=None):
+        try:
+            rows = list(self.iter_table_data(table_name, select=select, where=where))
+        except requests.RequestException:
             return None
+        logging.info(f"Data successfully fetched from table: {len(rows)} rows.")
+        return rows
 
     def post(self, resource, resource_name, data):
         url = f"{self.base_url}{resource}/{resource_name}/records?response=rows"
 
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
         try:
-            response = requests.post(url, json=data, headers=headers)
+            response = self._request('POST', url, json=data)
 
             if response.status_code == 200 or response.status_code == 201:
                 logging.info("POST request successful.")
@@ -155,11 +833,7 @@ class CaspioAPI:
     def put(self, resource, resource_name, query, data_for_update):
         try:
             url = f"{self.base_url}{resource}/{resource_name}/records?response=rows&{query}"
-            headers = {
-                "Authorization": f"Bearer {self.token}",
-                "Content-Type": "application/json"
-            }
-            response = requests.put(url, json=data_for_update, headers=headers)
+            response = self._request('PUT', url, json=data_for_update)
 
             if response.status_code in [200, 201]:
                 logging.info(response.json())
@@ -172,80 +846,783 @@ class CaspioAPI:
             logging.exception("An error occurred in PUT request.")
             return None
 
+    def bulk_upsert(self, resource_name, rows, key_field, existing_keys, max_workers=8, batch_size=50):
+        # Rows whose key is already stored are updates, the rest are inserts.
+        # Updates that carry the same payload are sent together as one PUT per
+        # batch_size keys (q.where=key IN (...)); inserts go one POST per row.
+        # Everything runs on a bounded pool and each row gets its own result,
+        # returned in the order of rows.
+        results = [None] * len(rows)
+        inserts = []
+        update_groups = {}
+        for index, row in enumerate(rows):
+            key = row[key_field]
+            if key in existing_keys:
+                payload = {field: value for field, value in row.items() if field != key_field}
+                group = json.dumps(payload, sort_keys=True, default=str)
+                update_groups.setdefault(group, (payload, []))[1].append((index, key))
+            else:
+                inserts.append((index, row))
+
+        def insert(index, row):
+            response = self.post('tables', resource_name, row)
+            return [(index, {'key': row[key_field], 'action': 'insert',
+                             'ok': response is not None, 'response': response})]
+
+        def update(payload, members):
+            keys = ", ".join("'{}'".format(str(key).replace("'", "''")) for _, key in members)
+            query = urlencode({'q.where': f"{key_field} IN ({keys})"})
+            response = self.put('tables', resource_name, query, payload)
+            updated_rows = {row.get(key_field): row for row in (response or {}).get('Result') or []}
+            return [(index, {'key': key, 'action': 'update', 'ok': response is not None,
+                             'response': updated_rows.get(key)})
+                    for index, key in members]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(insert, index, row) for index, row in inserts]
+            for payload, members in update_groups.values():
+                for start in range(0, len(members), batch_size):
+                    futures.append(executor.submit(
+                        update, payload, members[start:start + batch_size]))
+            from tqdm import tqdm
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Writing records"):
+                for index, result in future.result():
+                    results[index] = result
+        return results
+
+
+class AsyncCaspioAPI:
+    # asyncio counterpart of CaspioAPI with the same methods as coroutines.
+    # It shares the token, rate limiter, call counts, metrics and retry policy of the
+    # CaspioAPI it wraps; at most max_concurrency requests are in flight, over
+    # one aiohttp connection pool. Cancelling a task cancels its request.
+    #
+    #     async with AsyncCaspioAPI(api) as async_api:
+    #         rows = await asyncio.gather(*(async_api.post('tables', name, row) for row in rows))
+    def __init__(self, api=None, max_concurrency=50):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncCaspioAPI needs aiohttp: pip install aiohttp")
+        self.aiohttp = aiohttp
+        self.api = api or CaspioAPI(pool_size=1)
+        self.base_url = self.api.base_url
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        # Created on first use so it belongs to the running event loop
+        if self.session is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            connect_timeout, read_timeout = self.api.timeout
+            self.session = self.aiohttp.ClientSession(
+                connector=self.aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=self.aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+                headers={"Accept": "application/json"})
+        return self.session
+
+    async def _request(self, method, url, **kwargs):
+        # Same retry, rate-limit and 401 handling as CaspioAPI._request.
+        # Returns (status, parsed JSON or None, text).
+        session = self._get_session()
+        policy = self.api.retry_policy
+        retryable = {429} if method == 'POST' else RETRYABLE_STATUS
+        attempt = 0
+        token_renewed = False
+        while True:
+            while policy.breaker.remaining() > 0:
+                await asyncio.sleep(policy.breaker.remaining())
+            attempt += 1
+            # The token lock and the token endpoint are blocking, keep them off the loop
+            token = await asyncio.to_thread(self.api.get_access_token)
+            headers = {"Authorization": f"Bearer {token}"}
+            await asyncio.sleep(self.api.rate_limiter.reserve())
+            endpoint = self.api._count_call(method, url)
+            try:
+                async with self.semaphore:
+                    started = time.monotonic()
+                    async with session.request(method, url, headers=headers, **kwargs) as response:
+                        status, text = response.status, await response.text()
+                        retry_after = parse_retry_after(response)
+                error = None
+            except (self.aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status, text, retry_after, error = None, None, None, e
+            self.api.metrics.observe(
+                'api_request_seconds', time.monotonic() - started, method=method, endpoint=endpoint,
+                status=status if status is not None else type(error).__name__)
+
+            if status == 401 and not token_renewed:
+                logging.info("Access token rejected, renewing it.")
+                self.api.metrics.increment('token_renewals_total')
+                await asyncio.to_thread(self.api.get_access_token, token)
+                token_renewed = True
+                attempt -= 1
+                continue
+            if status is not None and status not in retryable:
+                if status >= 500:
+                    policy.breaker.record_failure()
+                else:
+                    policy.breaker.record_success()
+                try:
+                    payload = json.loads(text) if text else None
+                except ValueError:
+                    payload = None
+                return status, payload, text
+            policy.breaker.record_failure()
+            if (error and method == 'POST') or not policy.can_retry(attempt):
+                if error:
+                    raise error
+                return status, None, text
+
+            delay = policy.delay(attempt, retry_after=retry_after)
+            self.api.metrics.increment('retries_total', scope='api', endpoint=endpoint)
+            logging.warning(
+                f"{method} {url} failed ({error or status}), retry {attempt} in {delay:.1f}s.")
+            await asyncio.sleep(delay)
+
+    async def get_applications(self, app_name=None):
+        status, payload, text = await self._request('GET', self.base_url + "applications")
+        if status != 200:
+            logging.error(f"Error fetching applications: {status} - {text}")
+            return None
+        applications = payload["Result"]
+        if app_name:
+            return [app for app in applications if app_name.lower() in app["AppName"].lower()]
+        return applications
+
+    async def get_datapages_by_external_key(self, external_key=None, app_name=None):
+        if app_name and not external_key:
+            applications = await self.get_applications(app_name)
+            if not applications:
+                logging.error("No application found with the provided app_name.")
+                return None
+            external_key = applications[0]["ExternalKey"]
+        if not external_key:
+            logging.error("Missing external_key parameter.")
+            return None
+
+        status, payload, text = await self._request(
+            'GET', self.base_url + f"applications/{external_key}/datapages")
+        if status != 200:
+            logging.error(f"Error fetching datapages: {status} - {text}")
+            return None
+        return payload['Result']
+
+    async def iter_table_data(self, table_name, select=None, where=None, page_size=1000):
+        url = f"{self.base_url}tables/{table_name}/records"
+        params = {"q.pageSize": page_size}
+        if select:
+            params["q.select"] = select if isinstance(select, str) else ",".join(select)
+        if where:
+            params["q.where"] = where
+
+        page_number = 1
+        while True:
+            params["q.pageNumber"] = page_number
+            status, payload, text = await self._request('GET', url, params=dict(params))
+            if status != 200:
+                logging.error(f"Error fetching data from table: {status} - {text}")
+                raise requests.HTTPError(f"{status} fetching page {page_number} of {table_name}")
+
+            rows = (payload or {}).get('Result') or []
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            page_number += 1
+
+    async def get_table_data(self, table_name, select=None, where=None):
+        try:
+            return [row async for row in self.iter_table_data(table_name, select=select, where=where)]
+        except (requests.HTTPError, self.aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    async def post(self, resource, resource_name, data):
+        url = f"{self.base_url}{resource}/{resource_name}/records?response=rows"
+        try:
+            status, payload, text = await self._request('POST', url, json=data)
+        except (self.aiohttp.ClientError, asyncio.TimeoutError):
+            logging.exception("An error occurred in POST request.")
+            return None
+        if status in (200, 201):
+            result = (payload or {}).get('Result')
+            return result[0] if result else None
+        logging.error(f"Error in POST request: {status} - {text}")
+        return None
+
+    async def put(self, resource, resource_name, query, data_for_update):
+        url = f"{self.base_url}{resource}/{resource_name}/records?response=rows&{query}"
+        try:
+            status, payload, text = await self._request('PUT', url, json=data_for_update)
+        except (self.aiohttp.ClientError, asyncio.TimeoutError):
+            logging.exception("An error occurred in PUT request.")
+            return None
+        if status in (200, 201):
+            return payload
+        logging.error(f"Error in PUT request: {status} - {text}")
+        return None
+
+
+class RowExporter:
+    # Sink that writes captured datapage rows to path as they arrive. The
+    # columns are those of the first row. The file is opened on the first
+    # write; close() finishes it and may be called more than once.
+    def __init__(self, path):
+        self.path = path
+        self.fields = None
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row):
+        if self.fields is None:
+            self.fields = list(row)
+            self._open()
+        self._write(row)
+        self.rows += 1
+
+    def close(self):
+        if self.fields is not None:
+            self._close()
+            self.fields = None
+            logging.info(f"Exported {self.rows} rows to {self.path}.")
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write(self, row):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class CsvExporter(RowExporter):
+    # Flushed after every row, so the file is complete up to the last row
+    # captured even if the sweep dies
+    def __init__(self, path='allDataPagesInfo.csv'):
+        super().__init__(path)
+        self.file = None
+        self.writer = None
+
+    def _open(self):
+        self.file = open(self.path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fields, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def _write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+        self.file = None
+
+
+class ExcelExporter(RowExporter):
+    # openpyxl write-only workbook: rows are streamed to a temporary file and
+    # not kept in memory. The xlsx itself is only assembled by close().
+    def __init__(self, path='allDataPagesInfo.xlsx'):
+        super().__init__(path)
+        self.workbook = None
+        self.sheet = None
+
+    def _open(self):
+        from openpyxl import Workbook
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(self.fields)
+
+    def _write(self, row):
+        self.sheet.append([row.get(field) for field in self.fields])
+
+    def _close(self):
+        self.workbook.save(self.path)
+        self.workbook = None
+        self.sheet = None
+
+
+class ParquetExporter(RowExporter):
+    # Every row_group_size rows are written as one Parquet row group, so at
+    # most that many rows are held in memory. All columns are strings.
+    # Needs pyarrow, which is only imported here.
+    def __init__(self, path='allDataPagesInfo.parquet', row_group_size=1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("ParquetExporter needs pyarrow: pip install pyarrow")
+        super().__init__(path)
+        self.pyarrow = pyarrow
+        self.row_group_size = row_group_size
+        self.schema = None
+        self.writer = None
+        self.buffer = []
+
+    def _open(self):
+        self.schema = self.pyarrow.schema([(field, self.pyarrow.string()) for field in self.fields])
+        self.writer = self.pyarrow.parquet.ParquetWriter(self.path, self.schema)
+
+    def _write(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        columns = {field: [None if row.get(field) is None else str(row.get(field)) for row in self.buffer]
+                   for field in self.fields}
+        self.writer.write_table(self.pyarrow.table(columns, schema=self.schema))
+        self.buffer = []
+
+    def _close(self):
+        if self.buffer:
+            self._flush()
+        self.writer.close()
+        self.writer = None
+
+
+# Export formats by name, for --export
+EXPORTERS = {
+    'csv': CsvExporter,
+    'xlsx': ExcelExporter,
+    'parquet': ParquetExporter
+}
+
+
+def export_table(api, table_name, exporters):
+    # Streams every record of a Caspio table into the exporters, one REST
+    # page at a time
+    try:
+        for row in api.iter_table_data(table_name):
+            for exporter in exporters:
+                exporter.write(row)
+    finally:
+        for exporter in exporters:
+            exporter.close()
+
 
 class CaspioDataPageProcessor:
-    def __init__(self, email, password, app_name):
-        self.driver = self._initialize_driver()
-        self._login(email, password)
-        self.base_target_url = "https://umnitech.caspio.com/ui/search#"
-        self.caspioAPI = CaspioAPI()
+    def __init__(self, email, password, app_name, num_workers=1, api_rate=10, api_burst=20,
+                 incremental=False, recheck_days=7, state_file='datapageSweepState.json',
+                 lightweight_profile=True, profile_dir='chromeProfiles',
+                 checkpoint_file='datapageSweepCheckpoint.jsonl', resume=False,
+                 error_log_file='errorLogsCaspioDataPageProcessor.jsonl', retry_policy=None,
+                 pipelined=True, write_batch_size=50, write_queue_size=200, retain_results=True,
+                 metrics_file='sweepMetrics.json', prometheus_file=None,
+                 extraction='browser', ui_concurrency=8, ui_parser=None, exporters=(), start_browser=True):
+        # Each worker owns its own logged-in Chrome instance
+        self.num_workers = max(1, num_workers)
+        # Set lightweight_profile=False to compare against the plain Chrome setup
+        self.lightweight_profile = lightweight_profile
+        self.profile_dir = profile_dir
+        # Every scraped datapage is journaled so a crashed sweep can be resumed
+        self.checkpoint_file = checkpoint_file
+        self.resume = resume
+        self.checkpointed = self._load_checkpoint() if resume else {}
+        self._checkpoint = None
+        # Incremental sweeps only revisit new, modified or stale datapages
+        self.incremental = incremental
+        self.recheck_days = recheck_days
+        self.state_file = state_file
+        self.sweep_state = self._load_sweep_state() if incremental else {}
+        # Drivers whose listing columns were already configured
+        self._configured_drivers = set()
+        self.page_timeout = AdaptiveTimeout()
+        # Client-side API rate limit (requests per second and burst size)
+        self.api_rate = api_rate
+        self.api_burst = api_burst
+        # One policy (and circuit breaker) for the browsers and the REST client
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.base_target_url = CASPIO_BASE_URL + "ui/search#"
         self.allDataPagesInfo = []
-        self.errorsDataPages = []
-
-        self.datapages = self.caspioAPI.get_datapages_by_external_key(
-            app_name=app_name)
+        self.errors = ErrorJournal(error_log_file)
+        # Pipelined runs write rows while the browsers are still scraping;
+        # scraping pauses when write_queue_size rows are waiting to be written.
+        # retain_results=False keeps allDataPagesInfo empty in that mode.
+        self.pipelined = pipelined
+        self.write_batch_size = write_batch_size
+        self.write_queue_size = write_queue_size
+        self.retain_results = retain_results or not pipelined
+        self._write_queue = None
+        self._writer = None
+        # Row sinks (CsvExporter, ExcelExporter, ParquetExporter) fed with each
+        # datapage as it is captured; run() closes them when the sweep ends
+        self.exporters = list(exporters)
+        # Per-phase timings and counts, reported by run() to metrics_file and,
+        # for node_exporter's textfile collector, to prometheus_file
+        self.metrics = SweepMetrics()
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        # extraction='api' reads each datapage from the UI's JSON route with the
+        # cookies of one logged-in browser, ui_concurrency requests at a time.
+        # The browser only takes the datapages the JSON route fails for.
+        # ui_parser turns that JSON into the listing columns (the keys of
+        # LISTING_XPATHS) and the host pages lines of the Properties panel.
+        if extraction == 'api' and not (CASPIO_UI_DATAPAGE_PATH and ui_parser):
+            raise ValueError("extraction='api' needs CASPIO_UI_DATAPAGE_PATH and a ui_parser.")
+        self.extraction = extraction
+        self.ui_concurrency = ui_concurrency
+        self.ui_parser = ui_parser
+        self.ui_datapage_url = CASPIO_BASE_URL + CASPIO_UI_DATAPAGE_PATH if CASPIO_UI_DATAPAGE_PATH else None
+        self.ui_session = None
+        self._ui_session_stale = False
+        self._ui_failures = 0
+        self._ui_lock = threading.Lock()
+        num_browsers = 1 if extraction == 'api' else self.num_workers
+        # start_browser=False is a REST-only processor for the write-only, retry
+        # and export commands: no Chrome is launched and nothing can be scraped
+        if not start_browser:
+            num_browsers = 0
+
+        # Browser logins and the REST snapshot don't depend on each other,
+        # so start-up costs the slowest of them rather than their sum
+        with ThreadPoolExecutor(max_workers=num_browsers + 1) as executor:
+            driver_futures = [executor.submit(self._start_driver, email, password, index)
+                              for index in range(num_browsers)]
+            snapshot_future = executor.submit(self._load_snapshot, app_name)
+            # Every start is waited for, so that the drivers which did start
+            # are quit when another one (or the snapshot) failed
+            self.drivers = [future.result() for future in driver_futures
+                            if future.exception() is None]
+            try:
+                for future in driver_futures:
+                    future.result()
+                snapshot = snapshot_future.result()
+            except Exception:
+                self._quit_drivers()
+                raise
+
+        self.caspioAPI = snapshot['api']
+        self.datapages = snapshot['datapages']
         # Fetch the already processed datapages
-        self.Tbl_WMV_Datapage_Definitions = self.caspioAPI.get_table_data(
-            'WMV_Datapage_Definitions')
-        self.tableDataTitle = self.caspioAPI.get_table_data(
-            'WMV_Datapage_Definitions')
+        self.Tbl_WMV_Datapage_Definitions = snapshot['definitions']
+        # Existing rows keyed by Caspio_App_Key, kept current by the write phase
+        self.definitions_index = self._build_definitions_index(
+            self.Tbl_WMV_Datapage_Definitions)
+
+        if self.extraction == 'api' and self.drivers:
+            self.ui_session = self._create_ui_session(self.drivers[0])
 
         logging.info(f"Number of  datapages: {len(self.datapages)}")
 
-    def _initialize_driver(self):
+    def _load_snapshot(self, app_name):
+        # Every remote dataset the run needs, each fetched exactly once.
+        # The token comes first; the table load, the application list and then
+        # each application's datapage listing run concurrently.
+        api = CaspioAPI(pool_size=max(10, self.num_workers), retry_policy=self.retry_policy,
+                        rate=self.api_rate, burst=self.api_burst, metrics=self.metrics)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            definitions_future = executor.submit(
+                api.get_table_data, 'WMV_Datapage_Definitions')
+            applications = self._resolve_applications(api, app_name)
+            listings = executor.map(
+                lambda app: api.get_datapages_by_external_key(external_key=app["ExternalKey"]),
+                applications)
+            listings = list(listings)
+            for app, listing in zip(applications, listings):
+                # Like the definitions below: a failed listing is not an app
+                # without datapages, it would leave them out of the sweep
+                if listing is None:
+                    raise RuntimeError(
+                        f"Could not load the datapages of {app['AppName']}, stopping before the sweep.")
+                logging.info(f"{app['AppName']}: {len(listing)} datapages")
+            # Alternate between applications so every app moves forward
+            # together on the shared drivers
+            datapages = [datapage for datapage in chain.from_iterable(zip_longest(*listings))
+                         if datapage is not None]
+            definitions = definitions_future.result()
+            # An empty index would make every datapage look new and be inserted again
+            if definitions is None:
+                raise RuntimeError("Could not load WMV_Datapage_Definitions, stopping before any write.")
+            return {
+                'api': api,
+                'datapages': datapages,
+                'definitions': definitions,
+            }
+
+    @staticmethod
+    def _resolve_applications(api, app_name):
+        # app_name is one name, a list of names, or None/'*' for every
+        # application of the account. A name matches like get_applications(),
+        # by case-insensitive substring, taking the first match. An empty list
+        # loads no listing at all.
+        every_application = app_name in (None, '*')
+        names = [app_name] if isinstance(app_name, str) else app_name
+        if not every_application and not names:
+            return []
+        applications = api.get_applications()
+        if applications is None:
+            raise RuntimeError("Could not load the applications, stopping before the sweep.")
+        if every_application:
+            return applications
+        resolved = []
+        for name in names:
+            matches = [app for app in applications if name.lower() in app["AppName"].lower()]
+            if matches:
+                if matches[0] not in resolved:
+                    resolved.append(matches[0])
+            else:
+                logging.error(f"No application found with the name '{name}'.")
+        return resolved
+
+    def _load_sweep_state(self):
+        # AppKey -> {'DateModified': listing value, 'CheckedAt': ISO timestamp}
+        if not os.path.exists(self.state_file):
+            return {}
+        with open(self.state_file, 'r') as file:
+            return json.load(file)
+
+    def _save_sweep_state(self):
+        temp_file = self.state_file + '.tmp'
+        with open(temp_file, 'w') as file:
+            json.dump(self.sweep_state, file, indent=1)
+        os.replace(temp_file, self.state_file)
+
+    def _mark_checked(self, datapage):
+        if self.incremental:
+            self.sweep_state[datapage.get('AppKey')] = {
+                'DateModified': datapage.get('DateModified'),
+                'CheckedAt': datetime.now().isoformat()
+            }
+
+    def _needs_processing(self, datapage, now):
+        appkey = datapage.get('AppKey')
+        existing_row = self.definitions_index.get(appkey)
+        if existing_row is None:
+            return True
+
+        state = self.sweep_state.get(appkey)
+        if state is None:
+            # No local history yet: trust the stored row while its modified date
+            # matches the listing, and start its re-check clock now
+            if normalize_date(existing_row.get('Last_Modified_Date')) != normalize_date(datapage.get('DateModified')):
+                return True
+            self._mark_checked(datapage)
+            return False
+
+        if state.get('DateModified') != datapage.get('DateModified'):
+            return True
+        # Last_Used_Date changes without the datapage being modified,
+        # so every datapage is re-scraped once it is older than recheck_days
+        checked_at = datetime.fromisoformat(state['CheckedAt'])
+        return now - checked_at > timedelta(days=self.recheck_days)
+
+    def _select_datapages(self):
+        if not self.incremental:
+            return self.datapages
+        now = datetime.now()
+        selected = [datapage for datapage in self.datapages
+                    if self._needs_processing(datapage, now)]
+        logging.info(
+            f"Incremental sweep: {len(selected)} of {len(self.datapages)} datapages need processing.")
+        return selected
+
+    def _load_checkpoint(self):
+        # AppKey -> DataPageInfo captured by an earlier, unfinished run
+        checkpointed = {}
+        if not os.path.exists(self.checkpoint_file):
+            return checkpointed
+        with open(self.checkpoint_file, 'r') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by the crash
+                    continue
+                checkpointed[entry['AppKey']] = entry['DataPageInfo']
+        logging.info(f"Resuming with {len(checkpointed)} checkpointed datapages.")
+        return checkpointed
+
+    def _open_checkpoint(self):
+        # A resumed run keeps appending to the journal; a fresh run starts it over
+        self._checkpoint = open(self.checkpoint_file, 'a' if self.resume else 'w')
+        if self._checkpoint.tell() > 0:
+            # Don't glue the next entry onto a line cut short by the crash
+            self._checkpoint.write('\n')
+
+    def _record_checkpoint(self, datapage, data_info):
+        if self._checkpoint:
+            self._checkpoint.write(json.dumps(
+                {'AppKey': datapage.get('AppKey'), 'DataPageInfo': data_info}) + '\n')
+            self._checkpoint.flush()
+
+    def _close_checkpoint(self):
+        # Called once everything is written: the journal is no longer needed
+        self._checkpoint.close()
+        self._checkpoint = None
+        os.remove(self.checkpoint_file)
+
+    @staticmethod
+    def _build_definitions_index(rows):
+        index = {}
+        for row in rows:
+            # Keep the first row per key, like the linear scan did
+            index.setdefault(row.get('Caspio_App_Key'), row)
+        return index
+
+    def _initialize_driver(self, worker_index=0):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
         chrome_options = Options()
         chrome_options.add_argument("--headless")
         chrome_options.add_argument("--window-size=1920,1080")
+        if not self.lightweight_profile:
+            driver = webdriver.Chrome(options=chrome_options)
+
+            # Set zoom to 50%
+            driver.execute_script("document.body.style.zoom='50%'")
+
+            return driver
+
+        # Only the DOM matters to the scraper: return from get() once it is
+        # parsed, and skip everything Chrome would load or run besides the UI.
+        # The zoom above runs on a blank page and never applied, so it is dropped.
+        chrome_options.page_load_strategy = 'eager'
+        for argument in LIGHTWEIGHT_CHROME_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.default_content_setting_values.notifications": 2
+        })
+        if self.profile_dir:
+            # Only the HTTP cache is kept between runs, one directory per worker.
+            # A whole --user-data-dir would also carry over cookies and UI
+            # settings, and a remembered session skips the login form.
+            disk_cache_dir = os.path.abspath(
+                os.path.join(self.profile_dir, f"worker-{worker_index}"))
+            chrome_options.add_argument(f"--disk-cache-dir={disk_cache_dir}")
         driver = webdriver.Chrome(options=chrome_options)
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return driver
 
-        # Set zoom to 50%
-        driver.execute_script("document.body.style.zoom='50%'")
-        
+    def _start_driver(self, email, password, worker_index=0):
+        driver = self._initialize_driver(worker_index)
+        try:
+            self._login(driver, email, password)
+        except Exception:
+            driver.quit()
+            raise
         return driver
 
-    def _login(self, email, password):
-        login_url = "https://id.caspio.com/login"
-        self.driver.get(login_url)
+    def _quit_drivers(self):
+        for driver in self.drivers:
+            driver.quit()
+        self.drivers = []
+
+    def _create_ui_session(self, driver):
+        # Pooled HTTP client that passes for the logged-in browser
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.ui_concurrency,
+                              pool_maxsize=self.ui_concurrency, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "Accept": "application/json",
+            "X-Requested-With": "XMLHttpRequest",
+            "User-Agent": driver.execute_script("return navigator.userAgent")
+        })
+        self.ui_session = session
+        self._copy_browser_session(driver)
+        return session
+
+    def _copy_browser_session(self, driver):
+        for cookie in driver.get_cookies():
+            self.ui_session.cookies.set(cookie['name'], cookie['value'],
+                                        domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self._ui_session_stale = False
+
+    def _fetch_datapage(self, datapage):
+        # The datapage read from the UI's JSON route instead of the rendered
+        # page. Returns None when the browser has to take it instead.
+        url = self.ui_datapage_url.format(app_key=datapage.get('AppKey'))
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                response = self.ui_session.get(url, timeout=self.page_timeout.default)
+                status = response.status_code
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, status = None, type(e).__name__
+            self.metrics.observe('datapage_phase_seconds', time.monotonic() - started, phase='ui_api')
+            if status not in RETRYABLE_STATUS or not policy.can_retry(attempt):
+                break
+            self.metrics.increment('retries_total', scope='ui_api')
+            time.sleep(policy.delay(attempt, retry_after=parse_retry_after(response)))
+
+        if status == 200:
+            try:
+                data_info, host_pages = self.ui_parser(response.json())
+            except (ValueError, KeyError, TypeError, AttributeError):
+                status = 'unexpected_response'
+            else:
+                with self._ui_lock:
+                    self._ui_failures = 0
+                return self._build_datapage_info(datapage, data_info, find_last_used_date(host_pages))
+
+        self.metrics.increment('ui_api_fallbacks_total', reason=status)
+        logging.info(f"UI JSON route failed for {datapage.get('AppKey')} ({status}), using the browser.")
+        with self._ui_lock:
+            if status in (401, 403):
+                # The session expired: take fresh cookies from the next browser visit
+                self._ui_session_stale = True
+            self._ui_failures += 1
+            if self._ui_failures == UI_MAX_CONSECUTIVE_FAILURES and self.extraction == 'api':
+                logging.warning(
+                    f"UI JSON route failed {self._ui_failures} times in a row, "
+                    "the rest of the sweep uses the browser.")
+                self.extraction = 'browser'
+        return None
+
+    def _login(self, driver, email, password):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+        login_url = CASPIO_LOGIN_URL
+        driver.get(login_url)
         try:
-            WebDriverWait(self.driver, 10).until(
+            WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.ID, "EmailField")))
-            self.driver.find_element(By.ID, "EmailField").send_keys(email)
-            self.driver.find_element(
+            driver.find_element(By.ID, "EmailField").send_keys(email)
+            driver.find_element(
                 By.ID, "PasswordField").send_keys(password)
-            self.driver.find_element(
+            driver.find_element(
                 By.ID, "PasswordField").send_keys(Keys.RETURN)
-            WebDriverWait(self.driver, 10).until(
-                EC.url_contains("umnitech.caspio.com"))
+            WebDriverWait(driver, 10).until(
+                EC.url_contains(urlparse(CASPIO_BASE_URL).netloc))
         except TimeoutException as e:
-            print(f"Login failed: {e}")
-            self.driver.quit()
-            exit()
-
-    def _process_datapage(self, datapage, First=False):
-        def find_last_used_date(data_array):
-            most_recent_date = None
-            most_recent_date_str = ""
-            date_pattern = re.compile(r'(\d{2} \w{3} \d{4} \d{2}:\d{2} [AP]M)')
-
-            for item in data_array:
-                matches = date_pattern.findall(item)
-                for date_str in matches:
-                    try:
-                        date = datetime.strptime(date_str, '%d %b %Y %I:%M %p')
-                        if most_recent_date is None or date > most_recent_date:
-                            most_recent_date = date
-                            most_recent_date_str = date.strftime(
-                                '%m/%d/%Y')  # Format date as MM/DD/YYYY
-                    except ValueError:
-                        continue
+            raise RuntimeError(f"Login failed: the Caspio UI did not open from {login_url}.") from e
 
-            return most_recent_date_str if most_recent_date_str else None
+    def _process_datapage(self, driver, datapage, First=False):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver import ActionChains
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
 
         def find_title_by_app_key(app_key):
-            for row in self.tableDataTitle:
-                if row['Caspio_App_Key'] == app_key:
-                    return row.get('Title', '')
-            return None
+            row = self.definitions_index.get(app_key)
+            return row.get('Title', '') if row else None
 
         try:
             logging.info(f"Processing datapage: {datapage.get('AppKey')}")
@@ -253,60 +1630,56 @@ class CaspioDataPageProcessor:
             datapage_title = find_title_by_app_key(appkey)
 
             target_url = self.base_target_url + appkey
-
-            self.driver.get(target_url)
-            time.sleep(2)
+            timeout = self.page_timeout.timeout
+
+            # The UI is a single-page app: moving between AppKeys only changes the
+            # hash, so the listing still on screen must not pass for the new one
+            driver.execute_script(MARK_LISTING_STALE_JS)
+            started = time.monotonic()
+            with self.metrics.timer('datapage_phase_seconds', phase='navigation'):
+                driver.get(target_url)
+            try:
+                with self.metrics.timer('datapage_phase_seconds', phase='wait'):
+                    WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
+                        lambda d: d.execute_script(LISTING_READY_JS, appkey))
+                self.page_timeout.record(time.monotonic() - started)
+            except TimeoutException:
+                # The previous datapage's listing may still be on screen: reading
+                # it would store its columns under this AppKey. The page is retried.
+                self.metrics.increment('wait_timeouts_total')
+                logging.warning(f"Listing of {appkey} not ready after {timeout:.1f}s.")
+                raise
 
             # Click on settings icon and apply configuration only for the first element
             if First:
-                settings_icon = WebDriverWait(self.driver, 10).until(
+                configure_started = time.monotonic()
+                settings_icon = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
                     EC.visibility_of_element_located((By.ID, "settings-icon")))
                 settings_icon.click()
 
                 checkboxes = ["checkCol3", "checkCol4",
                               "checkCol8", "checkCol10"]
                 for checkbox_id in checkboxes:
-                    checkbox = self.driver.find_element(
+                    checkbox = driver.find_element(
                         by='id', value=checkbox_id)
-                    checkbox.click()
+                    # A click toggles, and the UI may already show some of
+                    # the columns: only tick the ones still off
+                    if not checkbox.is_selected():
+                        checkbox.click()
 
-                apply_button = self.driver.find_element(
+                apply_button = driver.find_element(
                     by='id', value="applyConfColumnSettings")
                 apply_button.click()
+                self.metrics.observe('datapage_phase_seconds', time.monotonic() - configure_started,
+                                     phase='configure')
 
-            def correct_xpath(xpath):
-                parts = xpath.split('/')
-                corrected = []
-                div2_count = 0
-                for part in parts:
-                    if 'div[2]' in part:
-                        div2_count += 1
-                        if div2_count == 2:
-                            continue
-                    corrected.append(part)
-                return '/'.join(corrected)
-
-            # Original XPaths
-            xpaths = {
-                'deployed': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[8]/div',
-                'data_source': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[3]/div',
-                'authentication': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[6]/div',
-                'style': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[4]/div',
-                'localization': '//*[@id="ListContent"]/div[2]/div/div[2]/div/div[5]/div'
-            }
+            # The listing row is read from a single DOM snapshot
+            with self.metrics.timer('datapage_phase_seconds', phase='extraction'):
+                data_info = extract_listing_info(driver.page_source)
 
-            data_info = {}
-            for key, xpath in xpaths.items():
-                try:
-                    element = self.driver.find_element(by='xpath', value=xpath)
-                except NoSuchElementException:
-                    # Correct the XPath and try again
-                    corrected_xpath = correct_xpath(xpath)
-                    element = self.driver.find_element(
-                        by='xpath', value=corrected_xpath)
-                data_info[key] = element.text
-
-            name_links = WebDriverWait(self.driver, 10).until(
+            # Everything up to the parsed Properties panel counts as 'properties'
+            properties_started = time.monotonic()
+            name_links = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
                 EC.visibility_of_all_elements_located((By.CLASS_NAME, "NameLink"))
             )
             if len(name_links) >= 2:
@@ -314,204 +1687,497 @@ class CaspioDataPageProcessor:
             else:
                 name_link = name_links[0]
             # Move cursor to "NameLink" element
-            ActionChains(self.driver).move_to_element(name_link).perform()
+            ActionChains(driver).move_to_element(name_link).perform()
 
-            properties_link = WebDriverWait(self.driver, 10).until(
+            properties_link = WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
                 EC.visibility_of_element_located(
                     (By.XPATH, "//div[@class='Menu']/a[contains(text(), 'Properties')]"))
             )
             properties_link.click()
 
-            try:
-                show_more_button = WebDriverWait(self.driver, 3).until(
-                    EC.visibility_of_element_located(
-                        (By.CLASS_NAME, "ShowMore"))
-                )
-                show_more_button.click()
-            except TimeoutException:
-                logging.info(
-                    "No 'Show More' button found or it took too long to appear.")
-            except NoSuchElementException:
-                # If 'Show More' button is absent
-                logging.info("No 'Show More' button found.")
-
-            WebDriverWait(self.driver, 10).until(
+            # The panel is ready once its lines are rendered; 'Show More' is part
+            # of it, so it is either there by now or absent and nothing waits on it
+            WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
                 EC.visibility_of_element_located(
                     (By.CLASS_NAME, "RowProperties"))
             )
+            WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL).until(
+                EC.presence_of_element_located(
+                    (By.XPATH, PROPERTIES_LINES_XPATH))
+            )
+            show_more_buttons = [button for button in driver.find_elements(By.CLASS_NAME, "ShowMore")
+                                 if button.is_displayed()]
+            if show_more_buttons:
+                show_more_buttons[0].click()
+            else:
+                logging.info("No 'Show More' button found.")
 
-            lines = self.driver.find_elements(
-                By.XPATH, "//div[@class='RowProperties Show']/div[@class='Content']/div[@class='Line']")
+            # ... and so is the Properties panel once it is open
+            lines = extract_properties_lines(driver.page_source)
+            self.metrics.observe('datapage_phase_seconds', time.monotonic() - properties_started,
+                                 phase='properties')
 
+            last_used_date = None
             host_pages_line = lines[-4] if len(lines) >= 4 else None
             if host_pages_line:
-                data_elements = host_pages_line.find_elements(
-                    By.XPATH, ".//div")
                 data_array = [
-                    element.text for element in data_elements if element.text != 'less...']
+                    text for text in host_pages_line if text != 'less...']
                 last_used_date = find_last_used_date(data_array)
 
-            DataPageInfo = {
-                'Channel_KW': 'UNIVERSAL',
-                'Active_YN': '1',
-                'Caspio_App_Key': appkey,
-                'App_Name': datapage.get('AppName'),
-                'Path': datapage.get('Path'),
-                'Name': datapage.get('Name'),
-                #'Datapage_Title': datapage_title,
-                'Deployed_YN': data_info['deployed'],
-                'Data_Source': data_info['data_source'],
-                'Authentication': data_info['authentication'],
-                'Style': data_info['style'],#
-                'Localization': data_info['localization'],
-                'Last_Used_Date': last_used_date,
-                'Created_Date': datapage.get('DateCreated'),
-                'Created_By_Person_Name': datapage.get('CreatedBy'),
-                'Last_Modified_Date': datapage.get('DateModified'),
-                'Last_Modified_By_Person_Name': datapage.get('ModifiedBy')
-            }
-
-            deployed = data_info['deployed']
-            DataPageInfo['Caspio_Bridge_Deployed_YN'] = '1' if deployed == 'Enabled' else '0' if deployed == 'Disabled' else deployed
-
-            def format_date(date_str):
-                try:
-                    return datetime.strptime(date_str.split('T')[0], '%Y-%m-%d').strftime('%m/%d/%Y')
-                except ValueError:
-                    return None
-
-            DataPageInfo['Datapage_Created_Date'] = format_date(
-                datapage.get('DateCreated'))
-            DataPageInfo['Last_Modified_Date'] = format_date(
-                datapage.get('DateModified'))
-
-            return DataPageInfo
+            return self._build_datapage_info(datapage, data_info, last_used_date)
 
         except Exception as e:
             logging.exception("An error occurred while processing a datapage.")
-            return None
-
-    def run(self):
-        for i, datapage in tqdm(enumerate(self.datapages), total=len(self.datapages), desc="Processing datapages"):
-            data_info = self._process_datapage(datapage, First=(i == 0))
-            if data_info:
-                self.allDataPagesInfo.append(data_info)
-            else:
-                self.errorsDataPages.append(datapage)
-        self._retry_errors()
-        self.driver.quit()
-        self._postToCaspioTable()
-
-    def _postToCaspioTable(self):
-
-        for datapage_info in tqdm(self.allDataPagesInfo, desc="Processing datapages"):
-            # Check if the row already exists in Tbl_WMV_Datapage_Definitions
-            existing_row = next(
-                (row for row in self.Tbl_WMV_Datapage_Definitions if row['Caspio_App_Key'] == datapage_info['Caspio_App_Key']), None)
-
-            if existing_row:
-                # Compare existing row with new data to decide whether to update
-                if self._is_data_different(existing_row, datapage_info):
-                    response = self.caspioAPI.put('tables', 'WMV_Datapage_Definitions',
-                                                  f"q.where=Caspio_App_Key='{datapage_info['Caspio_App_Key']}'", datapage_info)
-                    if response:
-                        logging.info(f"Data successfully updated: {response}")
-                    else:
-                        logging.error("Error in updating data")
-                        self.errorsDataPages.append(datapage_info)
-            else:
-                # Use POST request for new data
-                response = self.caspioAPI.post(
-                    'tables', 'WMV_Datapage_Definitions', datapage_info)
-                if response:
-                    logging.info(f"Data successfully posted: {response}")
-                else:
-                    logging.error("Error in posting data")
-                    self.errorsDataPages.append(datapage_info)
+            raise
+
+    def _build_datapage_info(self, datapage, data_info, last_used_date):
+        # The row written for a datapage, from its REST listing entry and the
+        # listing columns read from the UI (see LISTING_XPATHS)
+        DataPageInfo = {
+            'Channel_KW': 'UNIVERSAL',
+            'Active_YN': '1',
+            'Caspio_App_Key': datapage.get('AppKey'),
+            'App_Name': datapage.get('AppName'),
+            'Path': datapage.get('Path'),
+            'Name': datapage.get('Name'),
+            #'Datapage_Title': datapage_title,
+            'Deployed_YN': data_info['deployed'],
+            'Data_Source': data_info['data_source'],
+            'Authentication': data_info['authentication'],
+            'Style': data_info['style'],#
+            'Localization': data_info['localization'],
+            'Last_Used_Date': last_used_date,
+            'Created_Date': datapage.get('DateCreated'),
+            'Created_By_Person_Name': datapage.get('CreatedBy'),
+            'Last_Modified_Date': datapage.get('DateModified'),
+            'Last_Modified_By_Person_Name': datapage.get('ModifiedBy')
+        }
 
-    def _is_data_different(self, existing_row, new_data):
+        deployed = data_info['deployed']
+        DataPageInfo['Caspio_Bridge_Deployed_YN'] = '1' if deployed == 'Enabled' else '0' if deployed == 'Disabled' else deployed
 
+        def format_date(date_str):
+            try:
+                return datetime.strptime(date_str.split('T')[0], '%Y-%m-%d').strftime('%m/%d/%Y')
+            except ValueError:
+                return None
 
-        fields_to_compare = [
-            'Channel_KW', 'Active_YN', 'Caspio_App_Key', 'App_Name',
-            'Path', 'Name',  'Deployed_YN',
-            'Data_Source', 'Authentication', 'Style', 'Localization',
-            'Last_Used_Date', 'Created_Date', 'Created_By_Person_Name',
-            'Last_Modified_Date', 'Last_Modified_By_Person_Name'
-        ]
+        DataPageInfo['Datapage_Created_Date'] = format_date(
+            datapage.get('DateCreated'))
+        DataPageInfo['Last_Modified_Date'] = format_date(
+            datapage.get('DateModified'))
+
+        return DataPageInfo
+
+    def _process_datapages(self, datapages, desc, on_result=None):
+        # Spread the datapages over the driver pool. Results keep the input order;
+        # a datapage that failed gets None and is recorded in the error journal.
+        # on_result is called with each captured datapage as soon as it is done.
+        if datapages and not self.drivers:
+            raise RuntimeError("No browser running: create the processor with start_browser=True to scrape.")
+        results = [None] * len(datapages)
+        idle_drivers = queue.Queue()
+        for driver in self.drivers:
+            idle_drivers.put(driver)
+
+        def worker(index, datapage):
+            if self.extraction == 'api':
+                data_info = self._fetch_datapage(datapage)
+                if data_info:
+                    return index, data_info, None
+            policy = self.retry_policy
+            driver = idle_drivers.get()
+            try:
+                attempt = 0
+                while True:
+                    policy.breaker.wait_until_closed()
+                    attempt += 1
+                    try:
+                        First = driver not in self._configured_drivers
+                        data_info = self._process_datapage(driver, datapage, First=First)
+                        if First:
+                            self._configured_drivers.add(driver)
+                        if self._ui_session_stale and self.ui_session is not None:
+                            self._copy_browser_session(driver)
+                        policy.breaker.record_success()
+                        return index, data_info, None
+                    except Exception as e:
+                        if is_browser_failure(e):
+                            policy.breaker.record_failure()
+                        if not policy.can_retry(attempt):
+                            return index, None, e
+                        self.metrics.increment('retries_total', scope='scrape')
+                        time.sleep(policy.delay(attempt))
+            finally:
+                idle_drivers.put(driver)
+
+        # Only a couple of datapages per worker are queued at a time, so a slow
+        # on_result (a full write queue) holds the scrapers back. JSON fetches
+        # don't hold a driver, so in that mode there are more workers than drivers.
+        num_workers = self.ui_concurrency if self.extraction == 'api' else len(self.drivers)
+        remaining = iter(enumerate(datapages))
+        from tqdm import tqdm
+        with ThreadPoolExecutor(max_workers=num_workers) as executor, \
+                tqdm(total=len(datapages), desc=desc) as progress:
+            def submit_next():
+                item = next(remaining, None)
+                if item:
+                    running.add(executor.submit(worker, *item))
+
+            running = set()
+            for _ in range(2 * num_workers):
+                submit_next()
+            while running:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, data_info, error = future.result()
+                    datapage = datapages[index]
+                    progress.update()
+                    submit_next()
+                    if error:
+                        self.metrics.increment('datapages_total', result='failed')
+                        self.errors.record('scrape', datapage.get('AppKey'), datapage, error)
+                        continue
+                    self.metrics.increment('datapages_total', result='scraped')
+                    results[index] = data_info
+                    self.errors.resolve('scrape', datapage.get('AppKey'))
+                    self._record_checkpoint(datapage, data_info)
+                    if on_result:
+                        on_result(data_info)
+        return results
+
+    def _capture(self, data_info):
+        # Called with each datapage as soon as it is captured. A write that
+        # failed earlier for the datapage is superseded by this fresher row.
+        self.errors.resolve('write', data_info['Caspio_App_Key'])
+        for exporter in self.exporters:
+            exporter.write(data_info)
+        self._enqueue_write(data_info)
+
+    def _close_exporters(self):
+        for exporter in self.exporters:
+            try:
+                exporter.close()
+            except Exception:
+                logging.exception(f"Could not finish the export to {exporter.path}.")
+
+    def _keep_result(self, data_info):
+        if self.retain_results:
+            self.allDataPagesInfo.append(data_info)
+
+    def _start_writer(self):
+        self._write_queue = queue.Queue(maxsize=self.write_queue_size)
+        self._writer = threading.Thread(target=self._writer_loop, name="caspio-writer", daemon=True)
+        self._writer.start()
+
+    def _enqueue_write(self, data_info):
+        # Blocks while the queue is full: that is the backpressure on scraping
+        if self._write_queue is not None:
+            self._write_queue.put(data_info)
+
+    def _stop_writer(self):
+        self._write_queue.put(None)
+        self._writer.join()
+        self._write_queue = None
+        self._writer = None
+
+    def _writer_loop(self):
+        # Writes queued rows in batches of write_batch_size, or whatever has
+        # arrived once the queue has been idle for a couple of seconds
+        batch = []
+        stopping = False
+        while not stopping:
+            try:
+                data_info = self._write_queue.get(timeout=2)
+                if data_info is None:
+                    stopping = True
+                else:
+                    batch.append(data_info)
+                    if len(batch) < self.write_batch_size:
+                        continue
+            except queue.Empty:
+                pass
+            if batch:
+                try:
+                    self._postToCaspioTable(batch)
+                except Exception as e:
+                    logging.exception("An error occurred while writing a batch of datapages.")
+                    for row in batch:
+                        self.errors.record('write', row['Caspio_App_Key'], row, e)
+                batch = []
+
+    def run(self, retry_error_log=False):
+        started = datetime.now(timezone.utc)
+        succeeded = False
+        try:
+            self._sweep(retry_error_log)
+            succeeded = True
+        finally:
+            self._write_metrics(started, succeeded)
+
+    def _sweep(self, retry_error_log):
+        if retry_error_log:
+            # Merged in before scraping, so that datapages captured by this run
+            # resolve their old records instead of being retried afterwards
+            self.errors.load()
+        self._open_checkpoint()
+        if self.pipelined:
+            self._start_writer()
+        try:
+            # Datapages captured before a crash go straight to the write phase,
+            # also those of apps or datapages this run does not list: the
+            # checkpoint is deleted once the sweep is done
+            listed = {datapage.get('AppKey'): datapage for datapage in self.datapages}
+            for app_key, data_info in self.checkpointed.items():
+                self._keep_result(data_info)
+                if app_key in listed:
+                    self._mark_checked(listed[app_key])
+                self._capture(data_info)
+
+            datapages = [datapage for datapage in self._select_datapages()
+                         if datapage.get('AppKey') not in self.checkpointed]
+            results = self._process_datapages(
+                datapages, "Processing datapages", on_result=self._capture)
+            for datapage, data_info in zip(datapages, results):
+                if data_info:
+                    self._keep_result(data_info)
+                    self._mark_checked(datapage)
+            # Retry while the browsers are still up, including errors logged by
+            # earlier runs when retry_error_log is set
+            self._retry_errors()
+            if retry_error_log:
+                self.write_errors_to_file()
+        finally:
+            self._quit_drivers()
+            self._close_exporters()
+            if self._writer:
+                self._stop_writer()
+        if not self.pipelined:
+            self._postToCaspioTable()
+        self._close_checkpoint()
+        if self.incremental:
+            self._save_sweep_state()
+        self._log_api_usage()
+
+    def write_checkpointed(self):
+        # Writes the datapages journaled by an interrupted sweep, without
+        # scraping anything. The checkpoint is kept: a later --resume sweep
+        # skips those datapages and finds nothing left to write for them.
+        self.errors.load()
+        rows = list(self._load_checkpoint().values())
+        if rows:
+            self._postToCaspioTable(rows)
+        else:
+            logging.info(f"No checkpointed datapages in {self.checkpoint_file}.")
+        self.write_errors_to_file()
 
-        for field in fields_to_compare:
-            if existing_row.get(field) != new_data.get(field):
-                return True
+    def retry_error_log(self):
+        # Retries the errors logged by earlier runs, without a new sweep
+        try:
+            self._retry_errors(errorLogsCaspioDataPageProcessor=True)
+        finally:
+            self._quit_drivers()
+
+    def _write_metrics(self, started, succeeded):
+        # Also written when the sweep failed, so scheduled runs can alert on it
+        finished = datetime.now(timezone.utc)
+        duration = (finished - started).total_seconds()
+        self.metrics.set_gauge('sweep_duration_seconds', duration)
+        self.metrics.set_gauge('sweep_success', int(succeeded))
+        self.metrics.set_gauge('sweep_last_run_timestamp_seconds', finished.timestamp())
+        self.metrics.set_gauge('sweep_datapages', len(self.datapages))
+        self.metrics.set_gauge('error_journal_entries', len(self.errors))
+        try:
+            if self.metrics_file:
+                self.metrics.write_json(self.metrics_file, started=started.isoformat(),
+                                        finished=finished.isoformat(), duration_seconds=duration,
+                                        success=succeeded)
+            if self.prometheus_file:
+                self.metrics.write_prometheus(self.prometheus_file)
+        except OSError:
+            logging.exception("Could not write the sweep metrics.")
+
+    def _log_api_usage(self):
+        counts = self.caspioAPI.reset_call_counts()
+        logging.info(f"API calls this sweep: {sum(counts.values())}")
+        for endpoint, count in counts.most_common():
+            logging.info(f"  {endpoint}: {count}")
+
+    def _postToCaspioTable(self, rows=None):
+        # New rows are written in full, existing rows only with the fields that
+        # changed; the last scrape of an AppKey wins if it was captured twice
+        pending = {}
+        for datapage_info in self.allDataPagesInfo if rows is None else rows:
+            app_key = datapage_info['Caspio_App_Key']
+            existing_row = self.definitions_index.get(app_key)
+            if existing_row is None:
+                pending[app_key] = (datapage_info, datapage_info)
+                continue
+            changes = self._changed_fields(existing_row, datapage_info)
+            if changes:
+                pending[app_key] = (datapage_info, {'Caspio_App_Key': app_key, **changes})
+            else:
+                pending.pop(app_key, None)
+                self.metrics.increment('rows_total', action='skipped')
+        if not pending:
+            logging.info("No datapage changes to write.")
+            return
+
+        scraped_rows = [datapage_info for datapage_info, _ in pending.values()]
+        rows_to_write = [row for _, row in pending.values()]
+        results = self.caspioAPI.bulk_upsert(
+            'WMV_Datapage_Definitions', rows_to_write, 'Caspio_App_Key', self.definitions_index)
+        for datapage_info, result in zip(scraped_rows, results):
+            app_key = result['key']
+            if not result['ok']:
+                logging.error(f"Error in {result['action']} of {app_key}")
+                self.metrics.increment('rows_total', action='failed')
+                self.errors.record('write', app_key, datapage_info)
+                continue
+            self.metrics.increment(
+                'rows_total', action='inserted' if result['action'] == 'insert' else 'updated')
+            self.errors.resolve('write', app_key)
+            if result['action'] == 'update':
+                self.definitions_index[app_key] = {**self.definitions_index[app_key], **datapage_info}
+            else:
+                self.definitions_index[app_key] = result['response']
+        logging.info(
+            f"Wrote {sum(result['ok'] for result in results)} of {len(results)} changed datapages.")
 
-        return False
+    def _changed_fields(self, existing_row, new_data):
+        return diff_fields(existing_row, new_data, ignore=('Caspio_App_Key',))
 
     def write_errors_to_file(self):
-        with open('errorLogsCaspioDataPageProcessor.txt', 'w') as file:
-            for error in self.errorsDataPages:
-                file.write(str(error) + '\n')
+        # Rewrites the error log with the errors that are still unresolved
+        self.errors.save()
 
     def save_to_excel(self):
-        df = pd.DataFrame(self.allDataPagesInfo)
-        with pd.ExcelWriter('allDataPagesInfo.xlsx', engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
+        # After the run; pass exporters to the processor to export during it
+        with ExcelExporter('allDataPagesInfo.xlsx') as exporter:
+            for datapage_info in self.allDataPagesInfo:
+                exporter.write(datapage_info)
         print("Excel file created successfully.")
 
     def save_to_csv(self):
-        df = pd.DataFrame(self.allDataPagesInfo)
-        df.to_csv('allDataPagesInfo.csv', index=False)
+        with CsvExporter('allDataPagesInfo.csv') as exporter:
+            for datapage_info in self.allDataPagesInfo:
+                exporter.write(datapage_info)
         print("CSV file created successfully.")
 
     def _retry_errors(self, errorLogsCaspioDataPageProcessor=False):
-        successfully_processed = []
-
         if errorLogsCaspioDataPageProcessor:
-            # Read error logs and parse into datapages
-            with open('errorLogsCaspioDataPageProcessor.txt', 'r') as file:
-                retry_list = [ast.literal_eval(line) for line in file]
-        elif len(self.errorsDataPages) > 0:
-            logging.info(
-                f"Retrying {len(self.errorsDataPages)} errored datapages...")
-            retry_list = self.errorsDataPages
-            self.errorsDataPages = []
-        else:
+            # Merge in the errors left by earlier runs
+            self.errors.load()
+        if not len(self.errors):
             return  # Nothing to retry
 
-        # Process each errored datapage again
-        for i, datapage in tqdm(enumerate(retry_list), total=len(retry_list), desc="Retrying errored datapages"):
-            data_info = self._process_datapage(datapage, First=(i == 0))
-            if data_info:
-                self.allDataPagesInfo.append(data_info)
-                successfully_processed.append(datapage)
-            else:
-                self.errorsDataPages.append(datapage)
-
-        # Update the database
-        self._postToCaspioTable()
+        # Each error is retried in the phase it failed in: scrape errors go
+        # back through the browsers, write errors straight to the write phase
+        scrape_errors = self.errors.pending('scrape')
+        write_errors = self.errors.pending('write')
+        retried_rows = []
+        if scrape_errors and not self.drivers:
+            logging.info(
+                f"No browser running, {len(scrape_errors)} scrape errors stay in the log.")
+        elif scrape_errors:
+            logging.info(f"Retrying {len(scrape_errors)} errored datapages...")
+            retry_list = [record.payload for record in scrape_errors]
+            results = self._process_datapages(
+                retry_list, "Retrying errored datapages", on_result=self._capture)
+            for datapage, data_info in zip(retry_list, results):
+                if data_info:
+                    self._keep_result(data_info)
+                    self._mark_checked(datapage)
+                    retried_rows.append(data_info)
+        for record in write_errors:
+            self._keep_result(record.payload)
+            self._enqueue_write(record.payload)
+            retried_rows.append(record.payload)
+
+        # Update the database, unless the writer thread is already on it
+        if self._write_queue is None and retried_rows:
+            self._postToCaspioTable(retried_rows)
 
         # Update the error log file
         if errorLogsCaspioDataPageProcessor:
-            self._update_error_log(successfully_processed)
+            self.write_errors_to_file()
 
-    def _update_error_log(self, successfully_processed):
-        with open('errorLogsCaspioDataPageProcessor.txt', 'r') as file:
-            current_errors = [ast.literal_eval(line) for line in file]
-        # Filter out successfully processed datapages
-        updated_errors = [
-            error for error in current_errors if error not in successfully_processed]
-        with open('errorLogsCaspioDataPageProcessor.txt', 'w') as file:
-            for error in updated_errors:
-                file.write(str(error) + '\n')
 
+# Command line: each command starts only what it needs. sweep launches Chrome,
+# retry only when scrape errors are waiting, write-only and export never.
+COMMANDS = ['sweep', 'write-only', 'retry', 'export']
 
-if __name__ == "__main__":
-    processor = CaspioDataPageProcessor(
-        "Login", "Password", "WorkMovr 4") 
-    processor.run()
-    processor._retry_errors(errorLogsCaspioDataPageProcessor=True)
 
-    if len(processor.errorsDataPages) > 0:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command')
+
+    sweep = commands.add_parser('sweep', help="scrape and write datapages (the default)")
+    sweep.add_argument('--resume', action='store_true',
+                       help="skip datapages checkpointed by an interrupted sweep")
+    sweep.add_argument('--incremental', action='store_true',
+                       help="only visit datapages that are new, modified or due for a re-check")
+    sweep.add_argument('--recheck-days', type=int, default=7,
+                       help="with --incremental, re-check unchanged datapages after this many days")
+    sweep.add_argument('--app', action='append', dest='apps',
+                       help="application to sweep, can be repeated (default: WorkMovr 4)")
+    sweep.add_argument('--all-apps', action='store_true',
+                       help="sweep every application of the account")
+    sweep.add_argument('--export', action='append', choices=sorted(EXPORTERS), default=[],
+                       help="stream captured datapages to allDataPagesInfo.<format>, can be repeated")
+    sweep.add_argument('--metrics-file', default='sweepMetrics.json',
+                       help="JSON run report with per-phase timings and counts")
+    sweep.add_argument('--prometheus-file',
+                       help="also write the metrics here for node_exporter's textfile collector")
+
+    write_only = commands.add_parser(
+        'write-only', help="write the datapages checkpointed by an interrupted sweep, without a browser")
+    write_only.add_argument('--checkpoint-file', default='datapageSweepCheckpoint.jsonl')
+
+    retry = commands.add_parser('retry', help="retry the error log without a new sweep")
+    retry.add_argument('--no-browser', action='store_true',
+                       help="only retry write errors; scrape errors stay in the log")
+
+    export = commands.add_parser('export', help="export a Caspio table, without a browser")
+    export.add_argument('--format', action='append', choices=sorted(EXPORTERS), dest='formats',
+                        help="csv (default), xlsx or parquet, can be repeated")
+    export.add_argument('--table', default='WMV_Datapage_Definitions')
+
+    # Without a command the arguments are those of sweep
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS + ['-h', '--help']:
+        argv = ['sweep'] + argv
+    args = parser.parse_args(argv)
+
+    if args.command == 'sweep':
+        apps = None if args.all_apps else args.apps or ["WorkMovr 4"]
+        processor = CaspioDataPageProcessor(
+            "Login", "Password", apps, num_workers=4, resume=args.resume,
+            incremental=args.incremental, recheck_days=args.recheck_days,
+            metrics_file=args.metrics_file, prometheus_file=args.prometheus_file,
+            exporters=[EXPORTERS[name]() for name in args.export],
+            # The exporters stream each datapage as it is captured, so the rows
+            # are not kept in memory. Set it back to True to use save_to_*
+            retain_results=False)
+        processor.run(retry_error_log=True)
         processor.write_errors_to_file()
 
-    # processor.save_to_excel()
-    # processor.save_to_csv()
+        # processor.save_to_excel()
+        # processor.save_to_csv()
+
+    elif args.command == 'write-only':
+        processor = CaspioDataPageProcessor(
+            "Login", "Password", [], checkpoint_file=args.checkpoint_file, start_browser=False)
+        processor.write_checkpointed()
+
+    elif args.command == 'retry':
+        errors = ErrorJournal()
+        errors.load()
+        start_browser = bool(errors.pending('scrape')) and not args.no_browser
+        processor = CaspioDataPageProcessor(
+            "Login", "Password", [], num_workers=4, start_browser=start_browser)
+        processor.retry_error_log()
+
+    elif args.command == 'export':
+        export_table(CaspioAPI(), args.table,
+                     [EXPORTERS[name](f"{args.table}.{name}") for name in args.formats or ['csv']])